@@ -1,24 +1,23 @@
 import streamlit as st
 import pandas as pd
-from datetime import datetime, time, timedelta
+from datetime import timedelta
 import os
-import glob
-import time as time_module
-import pytz 
-import requests
+import threading
 import streamlit.components.v1 as components
 
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+# Solo moduli leggeri: scraping (selenium, requests) viene importato da
+# manovre.snapshot all'avvio di un aggiornamento e i browser solo se servono,
+# così un run che legge l'archivio non li carica mai.
+from manovre import store, tempi
+from manovre.comune import get_ora_trieste
+from manovre.interruttori import CHIUSO, SEMIAPERTO, APERTO, FONTE_TMT, FONTE_TASCO, interruttori
+from manovre.meteo import get_meteo_turni
+from manovre.snapshot import SnapshotCondiviso, esegui_aggiornamento
+from manovre.turni import (calcola_turno_attuale, genera_opzioni_future, vista_turno, style_manovre,
+                           finestra_griglia, etichetta_turno)
 
 # --- CONFIGURAZIONE ---
 st.set_page_config(page_title="Monitor Manovre Porto", layout="wide", initial_sidebar_state="collapsed")
-TZ_TRIESTE = pytz.timezone('Europe/Rome')
 
 # --- SISTEMA DI SICUREZZA (LOGIN) ---
 def check_password():
@@ -47,381 +46,104 @@ if not check_password():
 # APP VERA E PROPRIA
 # =========================================================
 
-def get_ora_trieste():
-    return datetime.now(TZ_TRIESTE).replace(tzinfo=None)
-
-# --- SESSION STATE ---
-if 'dati_totali' not in st.session_state:
-    st.session_state.dati_totali = pd.DataFrame(columns=['Terminal', 'Vessel', 'ETA', 'ETD'])
-if 'ultimo_aggiornamento' not in st.session_state:
-    st.session_state.ultimo_aggiornamento = None
-if 'debug_msg_tasco' not in st.session_state:
-    st.session_state.debug_msg_tasco = ""
-
-# --- BROWSER ---
-def get_driver():
-    chrome_options = Options()
-    chrome_options.add_argument("--headless")
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_argument("--window-size=1920,1080")
-    
-    download_dir = os.getcwd()
-    prefs = {
-        "download.default_directory": download_dir,
-        "download.prompt_for_download": False,
-        "download.directory_upgrade": True,
-        "safebrowsing.enabled": True
-    }
-    chrome_options.add_experimental_option("prefs", prefs)
-    
-    service = Service("/usr/bin/chromedriver")
-    return webdriver.Chrome(service=service, options=chrome_options)
-
-# --- LOGICA DI RICOSTRUZIONE ---
-def build_clean_df(source_data, terminal_input):
-    df = pd.DataFrame()
-    n_rows = len(source_data.get('Vessel', []))
-    
-    if isinstance(terminal_input, list):
-        if len(terminal_input) == n_rows:
-            df['Terminal'] = terminal_input
-        else:
-            df['Terminal'] = ["SIOT (N.D.)"] * n_rows
-    else:
-        df['Terminal'] = [terminal_input] * n_rows
-
-    df['Vessel'] = source_data.get('Vessel', [""] * n_rows)
-    df['ETA'] = source_data.get('ETA', [pd.NaT] * n_rows)
-    df['ETD'] = source_data.get('ETD', [pd.NaT] * n_rows)
-    
-    return df
-
-# --- 1. SCRAPING TMT ---
-def fetch_tmt_data(driver):
-    url = "https://www.trieste-marine-terminal.com/it"
-    try:
-        driver.get(url)
-        time_module.sleep(2)
-        dfs = pd.read_html(driver.page_source, match="Vessel", flavor='html5lib')
-        if len(dfs) > 0:
-            raw_df = dfs[0]
-            raw_df.columns = [str(c).strip() for c in raw_df.columns]
-            
-            vessels = raw_df['Vessel'].tolist() if 'Vessel' in raw_df.columns else []
-            
-            if 'ETB' in raw_df.columns:
-                etas = pd.to_datetime(raw_df['ETB'], dayfirst=True, errors='coerce').tolist()
-            else:
-                etas = [pd.NaT] * len(vessels)
-                
-            if 'ETD' in raw_df.columns:
-                etds = pd.to_datetime(raw_df['ETD'], dayfirst=True, errors='coerce').tolist()
-            else:
-                etds = [pd.NaT] * len(vessels)
-            
-            data_dict = {'Vessel': vessels, 'ETA': etas, 'ETD': etds}
-            return build_clean_df(data_dict, 'TMT (Molo VII)')
-            
-    except Exception as e:
-        print(f"Errore TMT: {e}")
-    
-    return pd.DataFrame(columns=['Terminal', 'Vessel', 'ETA', 'ETD'])
-
-# --- 2. SCRAPING TASCO ---
-def fetch_tasco_data(driver, status_container=None):
-    def log(msg):
-        if status_container:
-            status_container.write(msg)
-
-    st.session_state.debug_msg_tasco = "" 
-    if "tasco" not in st.secrets:
-        st.error("⚠️ Configura i Secrets [tasco]!")
-        return pd.DataFrame(columns=['Terminal', 'Vessel', 'ETA', 'ETD'])
+def get_config(chiave, default):
+    if "general" in st.secrets:
+        return st.secrets["general"].get(chiave, default)
+    return default
+
+# --- IMPOSTAZIONI ---
+SNAPSHOT_TTL_MIN = int(get_config("snapshot_ttl_min", 15))
+# Se valorizzato, i dati vengono letti dall'archivio scritto da `python -m manovre.scheduler`
+STORE_PATH = get_config("store_path", os.environ.get("MANOVRE_DB", ""))
+# TMT e TASCO scaricati con due browser in parallelo (più memoria, tempo = fonte più lenta)
+REFRESH_PARALLELO = bool(get_config("refresh_parallelo", True))
+# Tabella TMT letta prima via HTTP semplice, il browser solo come ripiego
+TMT_HTTP = bool(get_config("tmt_http", True))
+# Log JSONL dei tempi di ogni fase dell'aggiornamento (vuoto = disattivato)
+LOG_TEMPI = get_config("log_tempi", tempi.get_log_path())
+TEMPI_ULTIMI = int(get_config("tempi_ultimi", 20))
+# Giorni mostrati di default nella griglia di pianificazione (7-14)
+PIANIFICAZIONE_GIORNI = min(14, max(7, int(get_config("pianificazione_giorni", 7))))
+tempi.configura(LOG_TEMPI)
+
+# Snapshot condiviso da tutte le sessioni del processo (vedi manovre.snapshot)
+@st.cache_resource
+def get_snapshot():
+    return SnapshotCondiviso()
+
+# Limiti del pool di browser: i browser partono solo quando una fonte deve
+# ripiegare sul browser (di solito bastano le vie HTTP)
+POOL_DRIVER = dict(
+    dimensione=int(get_config("pool_driver", 2 if REFRESH_PARALLELO else 1)),
+    usi_max=int(get_config("driver_usi_max", 20)),
+    blocca_risorse=bool(get_config("blocca_risorse", True)),
+)
 
-    login_url = "https://tasco.tal-oil.com/ui/login"
-    
-    try:
-        wait = WebDriverWait(driver, 20)
-        
-        # LOGIN
-        log("🔑 Accesso SIOT in corso...")
-        driver.get(login_url)
-        pass_input = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "input[type='password']")))
-        try:
-            user_input = driver.find_element(By.XPATH, "//input[preceding::*[contains(text(), 'Login name')]]")
-        except:
-            user_input = driver.find_element(By.CSS_SELECTOR, "input[type='text']")
-
-        user_input.clear()
-        user_input.send_keys(st.secrets["tasco"]["username"])
-        pass_input.clear()
-        pass_input.send_keys(st.secrets["tasco"]["password"])
-        pass_input.send_keys(Keys.RETURN)
-        time_module.sleep(4)
-        log("✅ Login effettuato")
-
-        # NAVIGAZIONE
-        log("🧭 Navigazione menu TIMOS...")
-        try:
-            btn_timos = wait.until(EC.element_to_be_clickable((By.XPATH, "//*[contains(text(), 'Access to TIMOS')]")))
-            btn_timos.click()
-            time_module.sleep(3)
-            btn_bb = wait.until(EC.element_to_be_clickable((By.XPATH, "//*[contains(text(), 'Terminal Basic Blackboard')]")))
-            btn_bb.click()
-            time_module.sleep(5)
-            log("✅ Tabella raggiunta")
-        except:
-            log("❌ Errore navigazione menu")
-            return pd.DataFrame(columns=['Terminal', 'Vessel', 'ETA', 'ETD'])
-
-        # EXPORT
-        log("📥 Scaricamento file Excel...")
-        for f in glob.glob("*.xls*"):
-            try: os.remove(f)
-            except: pass
-
-        try:
-            btn_export = wait.until(EC.element_to_be_clickable((By.XPATH, "//*[contains(text(), 'Export')]")))
-            btn_export.click()
-        except:
-            log("❌ Tasto Export non trovato")
-            return pd.DataFrame(columns=['Terminal', 'Vessel', 'ETA', 'ETD'])
-            
-        # DOWNLOAD
-        file_scaricato = None
-        for i in range(15):
-            files = glob.glob("*.xls*")
-            if files:
-                file_scaricato = files[0]
-                break
-            time_module.sleep(1)
-            
-        if not file_scaricato:
-            log("❌ Timeout download")
-            return pd.DataFrame(columns=['Terminal', 'Vessel', 'ETA', 'ETD'])
-        
-        log(f"✅ File ricevuto: {os.path.basename(file_scaricato)}")
-        st.session_state.debug_msg_tasco = f"File elaborato: {os.path.basename(file_scaricato)}"
-        
-        raw_df = pd.read_excel(file_scaricato)
-        try: os.remove(file_scaricato)
-        except: pass
-        
-        return process_tasco_raw(raw_df)
-            
-    except Exception as e:
-        log(f"❌ Errore critico TASCO: {str(e)}")
-        return pd.DataFrame(columns=['Terminal', 'Vessel', 'ETA', 'ETD'])
-
-def process_tasco_raw(raw_df):
-    raw_df = raw_df.dropna(how='all')
-    raw_df.columns = [str(c).replace("?","").replace(".","").strip() for c in raw_df.columns]
-    
-    v_col = None
-    if 'Tanker Name' in raw_df.columns: v_col = 'Tanker Name'
-    elif 'Tanker' in raw_df.columns: v_col = 'Tanker'
-    vessels = raw_df[v_col].tolist() if v_col else ["Sconosciuto"] * len(raw_df)
-
-    b_col = None
-    if 'Berth' in raw_df.columns: b_col = 'Berth'
-    elif 'Pontile' in raw_df.columns: b_col = 'Pontile'
-    
-    terminal_labels = []
-    if b_col:
-        def format_berth(val):
-            if pd.isna(val) or str(val).strip() == "":
-                return "N.D."
-            try:
-                return str(int(float(val)))
-            except:
-                return str(val)
-
-        berth_values = raw_df[b_col].apply(format_berth).tolist()
-        terminal_labels = [f"SIOT ({b})" for b in berth_values]
-    else:
-        terminal_labels = ["SIOT (N.D.)"] * len(vessels)
-
-    current_year = get_ora_trieste().year
-    def parse_tasco_date(val):
-        val = str(val).strip()
-        if not val or val.lower() == 'nan': return pd.NaT
-        try:
-            if isinstance(val, str) and val.count('.') >= 2:
-                return pd.to_datetime(f"{val}{current_year}", format="%d.%m.%Y", dayfirst=True)
-        except: pass
-        return pd.to_datetime(val, errors='coerce')
-
-    etas = []
-    if 'POB' in raw_df.columns:
-        etas = raw_df['POB'].apply(parse_tasco_date).tolist()
-    else:
-        etas = [pd.NaT] * len(vessels)
+# --- AGGIORNAMENTO ---
+def credenziali_tasco():
+    return dict(st.secrets["tasco"]) if "tasco" in st.secrets else None
 
-    etds = []
-    if 'TLB' in raw_df.columns:
-        temp_etds = raw_df['TLB'].apply(parse_tasco_date)
-        etds = [x - timedelta(minutes=30) if pd.notnull(x) else pd.NaT for x in temp_etds]
-    else:
-        etds = [pd.NaT] * len(vessels)
+# Aggiornamento con le impostazioni dell'app (vedi manovre.snapshot)
+def aggiorna_snapshot(snapshot, credenziali, log, on_fonte=None):
+    from manovre.browser import pool_driver
 
-    data_dict = {'Vessel': vessels, 'ETA': etas, 'ETD': etds}
-    return build_clean_df(data_dict, terminal_labels)
+    pool_driver.configura(**POOL_DRIVER)
+    esegui_aggiornamento(snapshot, credenziali, log, on_fonte=on_fonte, parallelo=REFRESH_PARALLELO,
+                         tmt_http=TMT_HTTP, store_path=STORE_PATH)
 
-# --- AGGIORNAMENTO ---
-def aggiorna_dati():
-    with st.status("Aggiornamento dati in corso...", expanded=True) as status:
-        st.write("🔌 Avvio Browser remoto...")
-        driver = get_driver()
-        st.write("✅ Browser attivo")
-        
-        st.write("🛳️ Lettura dati TMT...")
-        df_tmt = fetch_tmt_data(driver)
-        st.write(f"✅ TMT completato ({len(df_tmt)} navi trovate)")
-        
-        df_tasco = fetch_tasco_data(driver, status_container=status)
-        
-        driver.quit()
-
-        frames = []
-        if not df_tmt.empty: frames.append(df_tmt)
-        if not df_tasco.empty: frames.append(df_tasco)
-        
-        if frames:
-            st.session_state.dati_totali = pd.concat(frames, ignore_index=True)
-            st.session_state.ultimo_aggiornamento = get_ora_trieste().strftime("%H:%M:%S")
-        else:
-            st.session_state.dati_totali = pd.DataFrame(columns=['Terminal', 'Vessel', 'ETA', 'ETD'])
-            
-        status.update(label="Scaricamento Completato!", state="complete", expanded=False)
+def aggiorna_dati(forza=False, on_fonte=None):
+    snapshot = get_snapshot()
 
-# --- NUOVA LOGICA TURNI ---
-def calcola_turno_attuale(ora_riferimento):
-    t_mattina_start = ora_riferimento.replace(hour=8, minute=0, second=0, microsecond=0)
-    t_sera_start = ora_riferimento.replace(hour=20, minute=0, second=0, microsecond=0)
-    
-    if 8 <= ora_riferimento.hour < 20:
-        start = t_mattina_start
-        end = t_sera_start
-        label = f"Diurno (08-20) del {start.strftime('%d/%m/%Y')}"
-    else:
-        if ora_riferimento.hour >= 20:
-            start = t_sera_start
-            end = t_sera_start + timedelta(hours=12)
-        else:
-            start = t_sera_start - timedelta(days=1)
-            end = t_mattina_start
-        
-        label = f"Notturno (20-08) del {start.strftime('%d/%m/%Y')}"
-    
-    return start, end, label
+    # Un solo browser per processo: chi arriva mentre un aggiornamento è in corso
+    # attende e poi legge lo stesso snapshot.
+    if not snapshot.lock.acquire(blocking=False):
+        with st.spinner("Aggiornamento già in corso da un'altra sessione, attendere..."):
+            with snapshot.lock:
+                pass
+        return
 
-def genera_opzioni_future(ora_riferimento):
-    opzioni = {}
-    _, fine_turno_attuale, _ = calcola_turno_attuale(ora_riferimento)
-    cursore = fine_turno_attuale
-    
-    for _ in range(6):
-        start = cursore
-        end = cursore + timedelta(hours=12)
-        if start.hour == 8:
-            tipo = "Diurno (08-20)" 
-            data_str = start.strftime('%d/%m/%Y')
-        else: 
-            tipo = "Notturno (20-08)"
-            data_str = start.strftime('%d/%m/%Y')
-            
-        label = f"{tipo} del {data_str}"
-        opzioni[label] = (start, end)
-        cursore = end
-    return opzioni
-
-# --- FUNZIONE METEO ---
-def get_meteo_turno(start_dt, end_dt):
-    lat = 45.649  # Trieste
-    lon = 13.778
-    url = f"https://api.open-meteo.com/v1/forecast?latitude={lat}&longitude={lon}&hourly=temperature_2m,precipitation_probability,weathercode,windspeed_10m,windgusts_10m&timezone=auto"
-    
     try:
-        response = requests.get(url, timeout=5)
-        data = response.json()
-        
-        if 'hourly' not in data:
-            return None
-
-        df_meteo = pd.DataFrame(data['hourly'])
-        df_meteo['time'] = pd.to_datetime(df_meteo['time'])
-        
-        start_naive = start_dt.replace(tzinfo=None)
-        end_naive = end_dt.replace(tzinfo=None)
-        
-        mask = (df_meteo['time'] >= start_naive) & (df_meteo['time'] <= end_naive)
-        df_turno = df_meteo[mask]
-        
-        if df_turno.empty:
-            return None
-            
-        t_min = df_turno['temperature_2m'].min()
-        t_max = df_turno['temperature_2m'].max()
-        wind_max_kt = round(df_turno['windspeed_10m'].max() * 0.539957, 1)
-        gust_max_kt = round(df_turno['windgusts_10m'].max() * 0.539957, 1)
-        code = df_turno['weathercode'].max()
-        
-        icon, desc = "☁️", "Variabile"
-        if code == 0: icon, desc = "☀️", "Sereno"
-        elif code in [1, 2, 3]: icon, desc = "⛅", "Nuvoloso"
-        elif code in [45, 48]: icon, desc = "🌫️", "Nebbia"
-        elif code in [51, 53, 55, 61, 63, 65]: icon, desc = "🌧️", "Pioggia"
-        elif code in [71, 73, 75, 77]: icon, desc = "❄️", "Neve"
-        elif code >= 95: icon, desc = "⛈️", "Temporale"
-        
-        return {
-            "temp": f"{t_min:.0f}° / {t_max:.0f}°",
-            "vento": f"{wind_max_kt} kt (Raff: {gust_max_kt})",
-            "meteo": f"{icon} {desc}"
-        }
-        
-    except Exception as e:
-        return None
-
-# --- STILE E COLORI ---
-def style_manovre(row):
-    styles = [''] * len(row.index)
-    now = get_ora_trieste()
-    
-    is_past = False
-    if pd.notnull(row['SortKey']):
-        if row['SortKey'] < now:
-            is_past = True
-
-    base_style = 'color: #a0a0a0;' if is_past else '' 
-    
-    def set_style(col_name, css):
+        if not forza and not snapshot.scaduto(SNAPSHOT_TTL_MIN):
+            return
+
+        with tempi.aggiornamento("app"), st.status("Aggiornamento dati in corso...", expanded=True) as status:
+            credenziali = credenziali_tasco()
+            if credenziali is None:
+                st.error("⚠️ Configura i Secrets [tasco]!")
+
+            aggiorna_snapshot(snapshot, credenziali, status.write, on_fonte)
+            status.update(label="Scaricamento Completato!", state="complete", expanded=False)
+    finally:
+        snapshot.lock.release()
+
+# Stale-while-revalidate: se ci sono già dati (anche scaduti) si mostrano
+# subito e l'aggiornamento gira in un thread. I messaggi vanno sul log del
+# processo (Streamlit non accetta scritture da altri thread); a fine lavoro
+# il frammento `attendi_revalida` ridisegna la pagina.
+def revalida_in_background():
+    snapshot = get_snapshot()
+    if not snapshot.lock.acquire(blocking=False):
+        return
+    credenziali = credenziali_tasco()
+    snapshot.revalida_in_corso = True
+
+    def lavoro():
         try:
-            idx = row.index.get_loc(col_name)
-            styles[idx] = f"{base_style} {css}"
-        except KeyError: pass
-
-    if is_past:
-        for i in range(len(styles)):
-            styles[i] = base_style
-
-    bg_arrivo = '#f2f9f4' if is_past else '#d4edda'
-    col_arrivo = '#a0a0a0' if is_past else '#155724' 
-    border_arrivo = '#a0a0a0' if is_past else '#155724'
-
-    bg_partenza = '#fdf2f4' if is_past else '#f8d7da'
-    col_partenza = '#a0a0a0' if is_past else '#721c24'
-    border_partenza = '#a0a0a0' if is_past else '#721c24'
-
-    if 'ARRIVO' in str(row['Tipo']):
-        set_style('ARRIVI', f'background-color: {bg_arrivo}; color: {col_arrivo}; font-weight: bold; border: 2px solid {border_arrivo}')
-        
-    if 'PARTENZA' in str(row['Tipo']):
-        set_style('PARTENZE', f'background-color: {bg_partenza}; color: {col_partenza}; font-weight: bold; border: 2px solid {border_partenza}')
-        
-    return styles
+            with tempi.aggiornamento("app-background"):
+                aggiorna_snapshot(snapshot, credenziali, lambda m: print(m, flush=True))
+        except Exception as e:
+            print(f"Errore aggiornamento in background: {e}")
+        finally:
+            snapshot.revalida_in_corso = False
+            snapshot.lock.release()
+
+    threading.Thread(target=lavoro, daemon=True).start()
+
+@st.fragment(run_every=3)
+def attendi_revalida(versione):
+    if get_snapshot().versione != versione:
+        st.rerun()
+    st.caption("🔄 Aggiornamento dati in background...")
 
 # --- INTERFACCIA ---
 st.title("⚓ Monitor Manovre Porto di Trieste 🚢")
@@ -430,12 +152,25 @@ st.markdown("I dati vengono prelevati dai siti web TMT e Tasco pertanto includon
 col_btn, col_sel_mode, col_sel_drop = st.columns([1, 1, 2])
 
 with col_btn:
-    if st.button("🔄 AGGIORNA SCARICANDO I DATI", type="primary"):
-        aggiorna_dati()
+    aggiorna_ora = st.button("🔄 AGGIORNA SCARICANDO I DATI", type="primary")
+
+# Qui compare lo stato dell'aggiornamento in primo piano, che parte solo dopo
+# aver disegnato la pagina: la tabella si riempie man mano che le fonti arrivano.
+area_aggiornamento = st.container()
+
+# Con l'archivio dello scheduler si legge solo l'ultimo snapshot salvato;
+# altrimenti si scarica in primo piano solo se non c'è nulla da mostrare,
+# con dati scaduti si mostrano quelli e si aggiorna in background.
+scarica_ora = aggiorna_ora
+if STORE_PATH:
+    get_snapshot().ricarica_da_store(STORE_PATH)
+elif get_snapshot().scaduto(SNAPSHOT_TTL_MIN):
+    if get_snapshot().fonti:
+        revalida_in_background()
+    else:
+        scarica_ora = True
 
-# Caricamento iniziale automatico
-if st.session_state.dati_totali.empty and st.session_state.ultimo_aggiornamento is None:
-    aggiorna_dati()
+snapshot = get_snapshot()
 
 # Gestione Selezione Turni
 ora_reale = get_ora_trieste()
@@ -463,74 +198,153 @@ st.info(banner_text)
 
 # --- BLOCCO METEO ---
 if start_filter and end_filter:
-    meteo = get_meteo_turno(start_filter, end_filter)
+    meteo = get_meteo_turni(ora_reale).get((start_filter, end_filter))
     if meteo:
         m1, m2, m3 = st.columns(3)
         m1.metric("🌡️ Temperatura (Min/Max)", meteo["temp"])
         m2.metric("💨 Vento Max (Nodi)", meteo["vento"])
         m3.metric("☔ Previsione", meteo["meteo"])
 
-if st.session_state.ultimo_aggiornamento:
-    st.caption(f"Ultimo scaricamento: {st.session_state.ultimo_aggiornamento} (Ora Locale)")
+def mostra_ultimo_aggiornamento(area):
+    if snapshot.ultimo_aggiornamento:
+        area.caption(f"Ultimo scaricamento: {snapshot.ultimo_aggiornamento.strftime('%H:%M:%S')} (Ora Locale)")
+
+area_ultimo = st.empty()
+mostra_ultimo_aggiornamento(area_ultimo)
+
+# --- STATO DELLE FONTI ---
+# Età dei dati mostrati e stato dell'interruttore di ogni fonte (dallo
+# scheduler tramite archivio, oppure da questo processo)
+ICONE_INTERRUTTORE = {CHIUSO: "🟢", SEMIAPERTO: "🟡", APERTO: "🔴"}
+
+def descrivi_eta(momento, ora):
+    if momento is None:
+        return "nessun dato"
+    minuti = int((ora - momento).total_seconds() // 60)
+    if minuti < 1:
+        return "dati appena scaricati"
+    if minuti < 120:
+        return f"dati di {minuti} min fa"
+    return f"dati di {minuti // 60} ore fa"
+
+def leggi_stato_fonti():
+    if STORE_PATH and not scarica_ora:
+        return store.stato_fonti(STORE_PATH)
+    return {
+        fonte: {"aggiornato_il": snapshot.fonti[fonte][2] if fonte in snapshot.fonti else None, **interruttori[fonte].descrivi()}
+        for fonte in (FONTE_TMT, FONTE_TASCO)
+    }
+
+def mostra_stato_fonte(area, fonte, stato, in_corso=False):
+    if in_corso:
+        area.caption(f"⏳ **{fonte}**: caricamento in corso...")
+        return
+    stato_int = stato.get("stato", CHIUSO)
+    testo = f"{ICONE_INTERRUTTORE.get(stato_int, '⚪')} **{fonte}**: {descrivi_eta(stato.get('aggiornato_il'), ora_reale)}"
+    if stato_int == APERTO and stato.get("riapertura_il"):
+        testo += f" · sospeso dopo {stato['errori']} errori, nuovo tentativo alle {stato['riapertura_il']:%H:%M}"
+    elif stato_int == SEMIAPERTO:
+        testo += " · tentativo di prova in corso"
+    area.caption(testo)
+
+stato_fonti = leggi_stato_fonti()
+aree_fonti = {}
+if stato_fonti:
+    for col_fonte, (fonte, stato) in zip(st.columns(len(stato_fonti)), stato_fonti.items()):
+        aree_fonti[fonte] = col_fonte.empty()
+        mostra_stato_fonte(aree_fonti[fonte], fonte, stato, in_corso=scarica_ora)
+
+if snapshot.revalida_in_corso:
+    attendi_revalida(snapshot.versione)
 
 st.divider()
 
 # --- VISUALIZZAZIONE E FILTRO DATI ---
-df_total = st.session_state.dati_totali
+# Tabella del turno in un segnaposto: durante un aggiornamento in primo piano
+# viene ridisegnata all'arrivo di ogni fonte.
+def mostra_turno(area, in_corso=False):
+    with area.container():
+        if snapshot.dati_totali.empty or not (start_filter and end_filter):
+            if in_corso:
+                st.info("In attesa dei dati...")
+            elif snapshot.ultimo_aggiornamento:
+                st.warning("Nessun dato trovato sui siti.")
+            else:
+                st.info("Premi il pulsante per scaricare i dati.")
+            return
 
-if not df_total.empty and start_filter and end_filter:
-    if 'ETA' in df_total.columns and 'ETD' in df_total.columns:
-        mask = ((df_total['ETA'] >= start_filter) & (df_total['ETA'] <= end_filter)) | \
-               ((df_total['ETD'] >= start_filter) & (df_total['ETD'] <= end_filter))
-        df_filtrato = df_total[mask].copy()
-    else:
-        df_filtrato = pd.DataFrame()
-    
-    if not df_filtrato.empty:
-        
-        def processa_riga(row):
-            azioni = []
-            orari_rilevanti = []
-            
-            if pd.notnull(row['ETA']) and start_filter <= row['ETA'] <= end_filter: 
-                azioni.append("ARRIVO")
-                orari_rilevanti.append(row['ETA'])
-                
-            if pd.notnull(row['ETD']) and start_filter <= row['ETD'] <= end_filter: 
-                azioni.append("PARTENZA")
-                orari_rilevanti.append(row['ETD'])
-            
-            tipo = " + ".join(azioni) if azioni else "-"
-            sort_key = min(orari_rilevanti) if orari_rilevanti else pd.NaT
-            
-            return pd.Series([tipo, sort_key])
+        df_filtrato = vista_turno(list(snapshot.turni.values()), start_filter, ora_reale)
+        if df_filtrato.empty:
+            st.info("Nessuna manovra prevista nel turno selezionato.")
+            return
 
-        df_filtrato[['Tipo', 'SortKey']] = df_filtrato.apply(processa_riga, axis=1)
-        df_filtrato = df_filtrato.sort_values(by='SortKey')
-        
         df_view = df_filtrato.rename(columns={'ETA': 'ARRIVI', 'ETD': 'PARTENZE'})
-        
-        cols_visible = ['Terminal', 'Vessel', 'ARRIVI', 'PARTENZE', 'Tipo', 'SortKey']
+
+        cols_visible = ['Terminal', 'Vessel', 'ARRIVI', 'PARTENZE', 'Tipo', 'SortKey', 'Passato']
         for c in ['Terminal', 'Vessel', 'ARRIVI', 'PARTENZE']:
              if c not in df_view.columns: df_view[c] = ""
-        
-        st.success(f"Trovate {len(df_filtrato)} manovre totali!")
-        
+
+        st.success(f"Trovate {len(df_filtrato)} manovre totali!" + (" (altre fonti in arrivo...)" if in_corso else ""))
+
         st.dataframe(
-            df_view[cols_visible].style.apply(style_manovre, axis=1).format({
+            df_view[cols_visible].style.apply(style_manovre, axis=None).format({
                 'ARRIVI': lambda t: t.strftime("%d/%m %H:%M") if pd.notnull(t) else "-",
                 'PARTENZE': lambda t: t.strftime("%d/%m %H:%M") if pd.notnull(t) else "-"
             }),
             use_container_width=True,
             column_config={
                 "Tipo": None,
-                "SortKey": None
+                "SortKey": None,
+                "Passato": None
             },
             hide_index=True
         )
-        
-    else:
-        st.info("Nessuna manovra prevista nel turno selezionato.")
+
+area_turno = st.empty()
+mostra_turno(area_turno, in_corso=scarica_ora)
+
+if scarica_ora:
+    def fonte_arrivata(fonte, df):
+        if fonte in aree_fonti:
+            mostra_stato_fonte(aree_fonti[fonte], fonte, leggi_stato_fonti()[fonte])
+        mostra_turno(area_turno, in_corso=True)
+
+    with area_aggiornamento:
+        aggiorna_dati(forza=aggiorna_ora, on_fonte=fonte_arrivata)
+
+    # Stato finale (comprese le fonti fallite o sospese) e tabella completa
+    mostra_ultimo_aggiornamento(area_ultimo)
+    for fonte, stato in leggi_stato_fonti().items():
+        if fonte in aree_fonti:
+            mostra_stato_fonte(aree_fonti[fonte], fonte, stato)
+    mostra_turno(area_turno)
+
+df_total = snapshot.dati_totali
+
+if not df_total.empty and start_filter and end_filter:
+    # --- PIANIFICAZIONE ---
+    # La griglia per turno è calcolata una volta per fonte quando arriva: qui
+    # si sceglie solo la finestra da mostrare e si uniscono le fonti.
+    with st.expander("📅 Pianificazione prossimi giorni", expanded=False):
+        giorni = st.slider("Giorni", min_value=7, max_value=14, value=PIANIFICAZIONE_GIORNI)
+        inizi, griglia = finestra_griglia(list(snapshot.griglie.values()), calcola_turno_attuale(ora_reale)[0], giorni)
+        etichette = [etichetta_turno(i) for i in inizi]
+
+        conteggi = griglia.pivot_table(index='Inizio', columns='Terminal', values=['Arrivi', 'Partenze'],
+                                       aggfunc='sum', fill_value=0).reindex(inizi, fill_value=0)
+        riepilogo = pd.DataFrame(index=etichette)
+        for terminal in sorted(griglia['Terminal'].unique()):
+            riepilogo[f"{terminal} ↓"] = conteggi[('Arrivi', terminal)].to_numpy()
+            riepilogo[f"{terminal} ↑"] = conteggi[('Partenze', terminal)].to_numpy()
+        riepilogo['Totale'] = riepilogo.sum(axis=1).astype(int)
+
+        tab_turni, tab_navi = st.tabs(["Per turno", "Navi"])
+        with tab_turni:
+            st.dataframe(riepilogo, use_container_width=True)
+        with tab_navi:
+            dettaglio = griglia.assign(Turno=griglia['Inizio'].map(etichetta_turno))
+            st.dataframe(dettaglio[['Turno', 'Terminal', 'Arrivi', 'Partenze', 'Navi']],
+                         use_container_width=True, hide_index=True)
 
     st.write("---")
     
@@ -564,10 +378,32 @@ if not df_total.empty and start_filter and end_filter:
             st.dataframe(df_total[df_total['Terminal'].str.contains("TMT")])
     with c2:
         with st.expander("Tabella Completa SIOT"):
-            st.write(f"ℹ️ {st.session_state.debug_msg_tasco}")
+            st.write(f"ℹ️ {snapshot.debug_msg_tasco}")
             st.dataframe(df_total[df_total['Terminal'].str.contains("SIOT")])
-else:
-    if st.session_state.ultimo_aggiornamento:
-        st.warning("Nessun dato trovato sui siti.")
-    else:
-        st.info("Premi il pulsante per scaricare i dati.")
+
+    if STORE_PATH:
+        with st.expander("🕓 Variazioni ETA ultime 24 ore"):
+            variazioni = store.variazioni_dal(STORE_PATH, ora_reale - timedelta(hours=24), solo_eta=True)
+            if variazioni.empty:
+                st.write("Nessuna variazione registrata.")
+            else:
+                st.dataframe(
+                    variazioni[['rilevato_il', 'Terminal', 'Vessel', 'eta_prima', 'ETA']].rename(
+                        columns={'rilevato_il': 'Rilevata', 'eta_prima': 'ETA precedente', 'ETA': 'ETA nuova'}
+                    ),
+                    hide_index=True
+                )
+
+# --- TEMPI DI AGGIORNAMENTO ---
+# Il log viene riletto solo quando cambia (stessa chiave = risultato in cache)
+@st.cache_data(max_entries=4)
+def statistiche_tempi(path, versione, ultimi):
+    return tempi.statistiche(tempi.leggi(path), ultimi)
+
+if LOG_TEMPI:
+    with st.expander(f"⏱️ Tempi di aggiornamento (ultimi {TEMPI_ULTIMI})"):
+        stat_tempi = statistiche_tempi(LOG_TEMPI, tempi.versione_log(LOG_TEMPI), TEMPI_ULTIMI)
+        if stat_tempi.empty:
+            st.write("Nessun aggiornamento registrato.")
+        else:
+            st.dataframe(stat_tempi.style.format(precision=2), hide_index=True)
@@ -0,0 +1 @@
+# Benchmark offline della pipeline dati (avvio: python -m benchmarks.<nome>).
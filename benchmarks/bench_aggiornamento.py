@@ -0,0 +1,101 @@
+# Aggiornamento completo (TMT + TASCO) contro il sito simulato, con Chromium
+# headless vero: misura il tempo di ogni passaggio a partire dai messaggi di log
+# di scarica_fonti, oppure dell'intero aggiorna_dati() dell'app (--app).
+#
+# Avvio: python -m benchmarks.bench_aggiornamento [--ripetizioni 3] [--sequenziale] [--app]
+# Accetta anche le opzioni del sito simulato (--righe, --ritardo-login, --tmt-dinamica, ...).
+import argparse
+import os
+import tempfile
+import time as time_module
+
+from benchmarks import sito_simulato
+
+def misura_scarica_fonti(credenziali, parallelo, tmt_http):
+    # Importato qui: gli URL dei siti vengono letti dalle variabili d'ambiente all'import
+    from manovre import tempi
+    from manovre.scraping import scarica_fonti
+
+    inizio = time_module.perf_counter()
+    passaggi = []
+
+    def log(msg):
+        passaggi.append((time_module.perf_counter() - inizio, msg))
+
+    with tempi.aggiornamento("benchmark"):
+        risultati = scarica_fonti(credenziali, parallelo=parallelo, tmt_http=tmt_http, log=log)
+    totale = time_module.perf_counter() - inizio
+
+    precedente = 0.0
+    for istante, msg in passaggi:
+        print(f"  {istante:>7.2f} s  (+{istante - precedente:>5.2f})  {msg}")
+        precedente = istante
+    for fonte, (df, nota) in risultati.items():
+        print(f"  {fonte}: {len(df)} navi {nota}")
+    return totale
+
+# Esegue app.py con AppTest: passa da login, snapshot condiviso e aggiorna_dati()
+# esattamente come una sessione del browser.
+def misura_app(credenziali, parallelo, tmt_http):
+    import streamlit as st
+    from streamlit.testing.v1 import AppTest
+
+    st.cache_resource.clear()  # snapshot vuoto: il primo run scarica i dati
+    app = AppTest.from_file(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py"),
+                            default_timeout=600)
+    app.secrets["general"] = {"app_password": "x", "refresh_parallelo": parallelo, "tmt_http": tmt_http}
+    app.secrets["tasco"] = credenziali
+    app.session_state["password_correct"] = True
+
+    inizio = time_module.perf_counter()
+    app.run()
+    totale = time_module.perf_counter() - inizio
+    if app.exception:
+        print(f"  Errore app: {app.exception[0].message}")
+    return totale
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Aggiornamento completo contro il sito simulato")
+    parser.add_argument("--ripetizioni", type=int, default=3)
+    parser.add_argument("--sequenziale", action="store_true")
+    parser.add_argument("--tmt-solo-browser", action="store_true")
+    parser.add_argument("--app", action="store_true", help="misura aggiorna_dati() di app.py invece di scarica_fonti")
+    sito_simulato.aggiungi_opzioni(parser)
+    args = parser.parse_args(argv)
+
+    sito = sito_simulato.sito_da_opzioni(args)
+    server = sito_simulato.crea_server(sito)
+    base = sito_simulato.url_base(server)
+    os.environ["MANOVRE_TMT_URL"] = base + "/it"
+    os.environ["MANOVRE_TASCO_URL"] = base
+    print(f"Sito simulato su {base}")
+
+    # Tempi per fase in un log a parte, per non mescolarli con quelli reali
+    log_tempi = os.path.join(tempfile.mkdtemp(prefix="bench_tempi_"), "tempi.jsonl")
+    os.environ["MANOVRE_LOG_TEMPI"] = log_tempi
+
+    from manovre import tempi
+    from manovre.browser import pool_driver
+    tempi.configura(log_tempi)
+    pool_driver.configura(dimensione=1 if args.sequenziale else 2)
+
+    credenziali = {"username": args.utente, "password": args.password}
+    misura = misura_app if args.app else misura_scarica_fonti
+    durate = []
+    try:
+        # Il primo giro paga avvio dei browser e login; i successivi riusano pool e sessione
+        for i in range(args.ripetizioni):
+            print(f"Aggiornamento {i + 1}:")
+            durate.append(misura(credenziali, not args.sequenziale, not args.tmt_solo_browser))
+            print(f"  totale {durate[-1]:.2f} s")
+    finally:
+        pool_driver.chiudi_tutti()
+        server.shutdown()
+
+    print("Tempi (s): " + ", ".join(f"{t:.2f}" for t in durate))
+    print("Richieste al sito simulato: " + ", ".join(f"{k}={v}" for k, v in sorted(sito.richieste.items())))
+    print(f"\nTempi per fase ({log_tempi}):")
+    print(tempi.statistiche(tempi.leggi(log_tempi), args.ripetizioni).to_string(index=False, float_format="%.3f"))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+# Avvio a freddo: quanto costa importare ogni modulo dell'app, gli import di
+# primo livello di app.py e il primo run di app.py (letto dall'archivio) in un
+# processo nuovo, e quali dipendenze pesanti restano caricate. Ogni misura gira
+# in un interprete separato, altrimenti i moduli già importati falserebbero i tempi.
+#
+# Con --rev le stesse misure vengono ripetute su un altro commit (estratto in
+# un worktree temporaneo) e affiancate a quelle dell'albero attuale. Gli import
+# di app.py si misurano su qualunque commit, anche sulla baseline senza il
+# pacchetto manovre; moduli e run dall'archivio solo dove esistono.
+#
+# Avvio: python -m benchmarks.bench_avvio [--ripetizioni 5] [--rev ca1e9c3]
+import argparse
+import ast
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time as time_module
+
+RADICE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULI = [
+    "manovre.comune", "manovre.turni", "manovre.store", "manovre.tempi", "manovre.interruttori",
+    "manovre.meteo", "manovre.ingest", "manovre.browser", "manovre.scraping",
+]
+# Dipendenze che un run in sola lettura non dovrebbe caricare (pytz non c'è:
+# lo carica comunque streamlit)
+PESANTI = ["selenium", "requests", "bs4", "lxml", "openpyxl",
+           "manovre.browser", "manovre.scraping", "manovre.ingest"]
+# Caricati prima di ogni misura: servono comunque all'app e non dipendono
+# dalla struttura dei suoi moduli
+PRECARICATI = "import pandas, numpy, streamlit"
+
+def _figlio(argomenti, radice=RADICE):
+    return subprocess.run([sys.executable, *argomenti], cwd=radice, capture_output=True, text=True, check=True)
+
+def _modulo_presente(radice, modulo):
+    base = os.path.join(radice, *modulo.split("."))
+    return os.path.exists(base + ".py") or os.path.exists(os.path.join(base, "__init__.py"))
+
+# Tempo cumulativo di import (-X importtime) del modulo, con pandas già caricato.
+def tempo_import(modulo, radice=RADICE):
+    risultato = _figlio(["-X", "importtime", "-c", f"import pandas, numpy; import {modulo}"], radice)
+    for riga in risultato.stderr.splitlines():
+        parti = [p.strip() for p in riga.split("|")]
+        if len(parti) == 3 and parti[2] == modulo:
+            return int(parti[1]) / 1e6
+    return None
+
+# Solo le istruzioni import di primo livello di app.py: è quello che ogni
+# processo paga prima di disegnare qualcosa, confrontabile tra commit diversi.
+def import_app(radice):
+    with open(os.path.join(radice, "app.py"), encoding="utf-8") as f:
+        albero = ast.parse(f.read())
+    return "\n".join(ast.unparse(n) for n in albero.body if isinstance(n, (ast.Import, ast.ImportFrom)))
+
+def tempo_import_app(radice=RADICE):
+    codice = (
+        f"import json, sys, time; {PRECARICATI}\n"
+        f"inizio = time.perf_counter()\n"
+        f"exec({import_app(radice)!r}, {{}})\n"
+        f"print(json.dumps({{'s': time.perf_counter() - inizio, "
+        f"'caricati': [m for m in {PESANTI!r} if m in sys.modules]}}))"
+    )
+    return json.loads(_figlio(["-c", codice], radice).stdout.strip().splitlines()[-1])
+
+# Eseguito nel processo figlio (cwd = radice dell'albero da misurare): primo
+# run e rerun di app.py con AppTest
+def misura_app(radice):
+    sys.path.insert(0, radice)
+    from streamlit.testing.v1 import AppTest
+
+    from benchmarks.fixtures import genera_snapshot
+    from manovre import meteo, store
+    from manovre.comune import get_ora_trieste
+
+    cartella = tempfile.mkdtemp(prefix="bench_avvio_")
+    db = os.path.join(cartella, "manovre.sqlite")
+    df = genera_snapshot(200, get_ora_trieste())
+    store.salva_fonte(db, "TMT", df[df["Terminal"].str.startswith("TMT")])
+    store.salva_fonte(db, "TASCO", df[df["Terminal"].str.startswith("SIOT")])
+    os.environ["MANOVRE_LOG_TEMPI"] = os.path.join(cartella, "tempi.jsonl")
+    # Previsioni già in cache: la loro durata dipende dalla rete, non dall'avvio
+    meteo._cache_meteo.ora_previsione = get_ora_trieste().replace(minute=0, second=0, microsecond=0)
+
+    app = AppTest.from_file(os.path.join(radice, "app.py"), default_timeout=120)
+    app.secrets["general"] = {"app_password": "x", "store_path": db}
+    app.session_state["password_correct"] = True
+
+    inizio = time_module.perf_counter()
+    app.run()
+    primo = time_module.perf_counter() - inizio
+    inizio = time_module.perf_counter()
+    app.run()
+    rerun = time_module.perf_counter() - inizio
+
+    print(json.dumps({
+        "primo_run_s": primo,
+        "rerun_s": rerun,
+        "caricati": [m for m in PESANTI if m in sys.modules],
+        "eccezioni": [e.message for e in app.exception],
+    }))
+
+# Tutte le misure su un albero; None dove il commit non ha il modulo o non
+# supporta la lettura dall'archivio.
+def misura(radice, ripetizioni):
+    moduli = {}
+    for modulo in MODULI:
+        durate = []
+        if _modulo_presente(radice, modulo):
+            durate = [d for d in (tempo_import(modulo, radice) for _ in range(ripetizioni)) if d is not None]
+        moduli[modulo] = statistics.median(durate) if durate else None
+
+    importazioni = [tempo_import_app(radice) for _ in range(ripetizioni)]
+
+    app = None
+    try:
+        misure = [json.loads(_figlio([os.path.abspath(__file__), "--figlio", "--radice", radice], radice).stdout.strip().splitlines()[-1])
+                  for _ in range(ripetizioni)]
+        app = {
+            "primo_run_s": statistics.median(m["primo_run_s"] for m in misure),
+            "rerun_s": statistics.median(m["rerun_s"] for m in misure),
+            "caricati": misure[-1]["caricati"],
+            "eccezioni": misure[-1]["eccezioni"],
+        }
+    except subprocess.CalledProcessError as e:
+        # Tipicamente un commit senza archivio (store) o senza benchmarks.fixtures
+        ultima = (e.stderr or "").strip().splitlines()[-1:] or ["errore sconosciuto"]
+        print(f"Run dall'archivio non misurabile in {radice}: {ultima[0]}", flush=True)
+
+    return {
+        "moduli": moduli,
+        "import_app_s": statistics.median(m["s"] for m in importazioni),
+        "import_app_caricati": importazioni[-1]["caricati"],
+        "app": app,
+    }
+
+def _ms(valore):
+    return "-" if valore is None else f"{valore * 1000:.1f}"
+
+def stampa(risultati, ripetizioni):
+    print(f"Import a freddo (mediana di {ripetizioni}, pandas escluso):")
+    for modulo, durata in risultati["moduli"].items():
+        print(f"  {modulo:<22} {_ms(durata):>8} ms")
+    print(f"  {'import di app.py':<22} {_ms(risultati['import_app_s']):>8} ms  (streamlit escluso)")
+
+    app = risultati["app"]
+    if app is None:
+        return
+    print(f"\napp.py in sola lettura dall'archivio (processo nuovo, mediana di {ripetizioni}):")
+    print(f"  primo run  {app['primo_run_s']:>7.3f} s")
+    print(f"  rerun      {app['rerun_s']:>7.3f} s")
+    print(f"  dipendenze pesanti caricate: {', '.join(app['caricati']) or 'nessuna'}")
+    if app["eccezioni"]:
+        print(f"  errori app: {app['eccezioni']}")
+
+def stampa_confronto(base, nuovo, rev, ripetizioni):
+    def riga(nome, b, n, unita=1000, formato=".1f"):
+        rapporto = f"{n / b:>8.2f}x" if b and n is not None else f"{'-':>9}"
+        valore = lambda v: "-" if v is None else f"{v * unita:{formato}}"
+        print(f"  {nome:<22} {valore(b):>11} {valore(n):>11} {rapporto}")
+
+    print(f"{rev} -> albero attuale (mediana di {ripetizioni}, pandas escluso)")
+    print(f"  {'import (ms)':<22} {'base':>11} {'nuovo':>11} {'rapporto':>9}")
+    for modulo in MODULI:
+        riga(modulo, base["moduli"][modulo], nuovo["moduli"][modulo])
+    riga("import di app.py", base["import_app_s"], nuovo["import_app_s"])
+    print(f"  pesanti dopo gli import: {', '.join(base['import_app_caricati']) or 'nessuna'}"
+          f" -> {', '.join(nuovo['import_app_caricati']) or 'nessuna'}")
+
+    app_base, app_nuovo = base["app"] or {}, nuovo["app"] or {}
+    print(f"\n  {'app dall archivio (s)':<22} {'base':>11} {'nuovo':>11} {'rapporto':>9}")
+    for chiave, nome in (("primo_run_s", "primo run"), ("rerun_s", "rerun")):
+        riga(nome, app_base.get(chiave), app_nuovo.get(chiave), unita=1, formato=".3f")
+
+# Estrae `rev` in un worktree temporaneo, misura lì e poi lo rimuove
+def misura_rev(rev, ripetizioni):
+    cartella = tempfile.mkdtemp(prefix="bench_avvio_rev_")
+    worktree = os.path.join(cartella, "albero")
+    subprocess.run(["git", "worktree", "add", "--detach", worktree, rev], cwd=RADICE, capture_output=True, check=True)
+    try:
+        return misura(worktree, ripetizioni)
+    finally:
+        subprocess.run(["git", "worktree", "remove", "--force", worktree], cwd=RADICE, capture_output=True)
+        shutil.rmtree(cartella, ignore_errors=True)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tempi di import e di avvio a freddo dell'app")
+    parser.add_argument("--ripetizioni", type=int, default=5)
+    parser.add_argument("--rev", help="commit git da misurare accanto all'albero attuale (es. la baseline)")
+    parser.add_argument("--figlio", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--radice", default=RADICE, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.figlio:
+        return misura_app(args.radice)
+
+    if args.rev:
+        base = misura_rev(args.rev, args.ripetizioni)
+        stampa_confronto(base, misura(RADICE, args.ripetizioni), args.rev, args.ripetizioni)
+        return
+
+    stampa(misura(RADICE, args.ripetizioni), args.ripetizioni)
+
+if __name__ == "__main__":
+    main()
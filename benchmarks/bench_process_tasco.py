@@ -0,0 +1,38 @@
+# Confronto tra la normalizzazione TASCO vettoriale (manovre.scraping) e la
+# versione originale riga per riga, su export sintetici di varie dimensioni.
+# Avvio: python -m benchmarks.bench_process_tasco [--righe 1000 5000 20000]
+import argparse
+import time as time_module
+
+import pandas as pd
+
+from benchmarks.fixtures import genera_export
+from benchmarks.riferimento import process_tasco_raw_righe
+from manovre.scraping import process_tasco_raw
+
+def cronometra(funzione, raw_df, ripetizioni):
+    tempi = []
+    for _ in range(ripetizioni):
+        copia = raw_df.copy()
+        inizio = time_module.perf_counter()
+        funzione(copia)
+        tempi.append(time_module.perf_counter() - inizio)
+    return min(tempi)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark process_tasco_raw: riga per riga vs vettoriale")
+    parser.add_argument("--righe", type=int, nargs="+", default=[100, 1000, 5000, 20000])
+    parser.add_argument("--ripetizioni", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    print(f"{'righe':>8} {'righe (s)':>12} {'vettoriale (s)':>15} {'speedup':>8}")
+    for n in args.righe:
+        raw_df = genera_export(n)
+        pd.testing.assert_frame_equal(process_tasco_raw(raw_df.copy()), process_tasco_raw_righe(raw_df.copy()))
+
+        t_righe = cronometra(process_tasco_raw_righe, raw_df, args.ripetizioni)
+        t_vett = cronometra(process_tasco_raw, raw_df, args.ripetizioni)
+        print(f"{n:>8} {t_righe:>12.4f} {t_vett:>15.4f} {t_righe / t_vett:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
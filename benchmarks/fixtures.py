@@ -0,0 +1,77 @@
+# Dati sintetici con la stessa forma di quelli reali: tabella HTML TMT come la
+# legge fetch_tmt_data ed export Excel TASCO con Tanker Name/Berth/POB/TLB.
+import os
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+BASE = datetime(2026, 1, 1)
+
+# --- TASCO ---
+# Valori come arrivano da openpyxl: pontili numerici o testuali, celle vuote,
+# date "gg.mm." senza anno, date complete e testi non interpretabili.
+def genera_export(n_righe, seme=0):
+    rng = np.random.default_rng(seme)
+
+    def data_tasco(i):
+        scelta = rng.integers(0, 10)
+        giorno = BASE + timedelta(days=int(rng.integers(0, 360)), minutes=int(rng.integers(0, 1440)))
+        if scelta < 6: return giorno.strftime("%d.%m.")
+        if scelta < 8: return giorno
+        if scelta == 8: return np.nan
+        return "TBA"
+
+    berth_pool = [1, 2, 3, 4.0, "5", " 6 ", "", np.nan, "N/A", "2bis"]
+    return pd.DataFrame({
+        "Tanker Name": [f"TANKER {i}" for i in range(n_righe)],
+        "Berth": [berth_pool[rng.integers(0, len(berth_pool))] for _ in range(n_righe)],
+        "POB": [data_tasco(i) for i in range(n_righe)],
+        "TLB": [data_tasco(i) for i in range(n_righe)],
+        "Cargo": ["CRUDE"] * n_righe,
+        "Qty.": rng.integers(10000, 150000, n_righe),
+    })
+
+def scrivi_export_xlsx(n_righe, cartella, seme=0):
+    percorso = os.path.join(cartella, f"tasco_{n_righe}.xlsx")
+    genera_export(n_righe, seme).to_excel(percorso, index=False)
+    return percorso
+
+# --- TMT ---
+def genera_tmt_html(n_righe, seme=0):
+    rng = np.random.default_rng(seme)
+    righe = []
+    for i in range(n_righe):
+        etb = BASE + timedelta(days=int(rng.integers(0, 360)), minutes=30 * int(rng.integers(0, 48)))
+        etd = etb + timedelta(hours=int(rng.integers(6, 60)))
+        righe.append(
+            f"<tr><td>MSC VESSEL {i}</td><td>{rng.integers(100, 999)}W</td><td>MSC</td>"
+            f"<td>{etb:%d/%m/%Y %H:%M}</td><td>{etd:%d/%m/%Y %H:%M}</td></tr>"
+        )
+    return (
+        "<html><head><title>Trieste Marine Terminal</title></head><body>"
+        "<table><tr><td>Menu</td><td>Contatti</td></tr></table>"
+        "<table class='berthing'><thead><tr><th>Vessel</th><th>Voyage</th><th>Line</th>"
+        "<th>ETB</th><th>ETD</th></tr></thead><tbody>"
+        + "".join(righe) +
+        "</tbody></table></body></html>"
+    )
+
+# --- SNAPSHOT UNITO ---
+# Tabella nel formato di build_clean_df, concentrata intorno a `centro` così
+# che ogni turno contenga un numero di manovre proporzionale alle righe.
+def genera_snapshot(n_righe, centro, seme=0):
+    rng = np.random.default_rng(seme)
+
+    def orari():
+        minuti = rng.integers(-3 * 24 * 60, 4 * 24 * 60, n_righe)
+        valori = pd.Series(pd.Timestamp(centro) + pd.to_timedelta(minuti, unit="min"))
+        return valori.mask(rng.random(n_righe) < 0.15)
+
+    terminal = np.where(rng.random(n_righe) < 0.5, "TMT (Molo VII)", "SIOT (1)")
+    return pd.DataFrame({
+        "Terminal": terminal,
+        "Vessel": [f"NAVE {i}" for i in range(n_righe)],
+        "ETA": orari(),
+        "ETD": orari(),
+    })
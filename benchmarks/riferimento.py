@@ -0,0 +1,143 @@
+# Implementazioni originali, riga per riga, conservate come riferimento per
+# verificare che le versioni vettoriali diano lo stesso risultato e per
+# misurarne il guadagno nei benchmark.
+from datetime import timedelta
+
+import pandas as pd
+
+from manovre.comune import get_ora_trieste
+
+# --- NORMALIZZAZIONE TASCO ---
+def _build_clean_df_righe(source_data, terminal_input):
+    df = pd.DataFrame()
+    n_rows = len(source_data.get('Vessel', []))
+
+    if isinstance(terminal_input, list):
+        if len(terminal_input) == n_rows:
+            df['Terminal'] = terminal_input
+        else:
+            df['Terminal'] = ["SIOT (N.D.)"] * n_rows
+    else:
+        df['Terminal'] = [terminal_input] * n_rows
+
+    df['Vessel'] = source_data.get('Vessel', [""] * n_rows)
+    df['ETA'] = source_data.get('ETA', [pd.NaT] * n_rows)
+    df['ETD'] = source_data.get('ETD', [pd.NaT] * n_rows)
+    return df
+
+def process_tasco_raw_righe(raw_df):
+    raw_df = raw_df.dropna(how='all')
+    raw_df.columns = [str(c).replace("?","").replace(".","").strip() for c in raw_df.columns]
+
+    v_col = None
+    if 'Tanker Name' in raw_df.columns: v_col = 'Tanker Name'
+    elif 'Tanker' in raw_df.columns: v_col = 'Tanker'
+    vessels = raw_df[v_col].tolist() if v_col else ["Sconosciuto"] * len(raw_df)
+
+    b_col = None
+    if 'Berth' in raw_df.columns: b_col = 'Berth'
+    elif 'Pontile' in raw_df.columns: b_col = 'Pontile'
+
+    if b_col:
+        def format_berth(val):
+            if pd.isna(val) or str(val).strip() == "":
+                return "N.D."
+            try:
+                return str(int(float(val)))
+            except:
+                return str(val)
+
+        berth_values = raw_df[b_col].apply(format_berth).tolist()
+        terminal_labels = [f"SIOT ({b})" for b in berth_values]
+    else:
+        terminal_labels = ["SIOT (N.D.)"] * len(vessels)
+
+    current_year = get_ora_trieste().year
+    def parse_tasco_date(val):
+        val = str(val).strip()
+        if not val or val.lower() == 'nan': return pd.NaT
+        try:
+            if isinstance(val, str) and val.count('.') >= 2:
+                return pd.to_datetime(f"{val}{current_year}", format="%d.%m.%Y", dayfirst=True)
+        except: pass
+        return pd.to_datetime(val, errors='coerce')
+
+    if 'POB' in raw_df.columns:
+        etas = raw_df['POB'].apply(parse_tasco_date).tolist()
+    else:
+        etas = [pd.NaT] * len(vessels)
+
+    if 'TLB' in raw_df.columns:
+        temp_etds = raw_df['TLB'].apply(parse_tasco_date)
+        etds = [x - timedelta(minutes=30) if pd.notnull(x) else pd.NaT for x in temp_etds]
+    else:
+        etds = [pd.NaT] * len(vessels)
+
+    data_dict = {'Vessel': vessels, 'ETA': etas, 'ETD': etds}
+    return _build_clean_df_righe(data_dict, terminal_labels)
+
+# --- CLASSIFICAZIONE TURNO (processa_riga) ---
+def classifica_turno_righe(df, start_filter, end_filter):
+    mask = ((df['ETA'] >= start_filter) & (df['ETA'] <= end_filter)) | \
+           ((df['ETD'] >= start_filter) & (df['ETD'] <= end_filter))
+    df_filtrato = df[mask].copy()
+    if df_filtrato.empty:
+        return df_filtrato
+
+    def processa_riga(row):
+        azioni = []
+        orari_rilevanti = []
+
+        if pd.notnull(row['ETA']) and start_filter <= row['ETA'] <= end_filter:
+            azioni.append("ARRIVO")
+            orari_rilevanti.append(row['ETA'])
+
+        if pd.notnull(row['ETD']) and start_filter <= row['ETD'] <= end_filter:
+            azioni.append("PARTENZA")
+            orari_rilevanti.append(row['ETD'])
+
+        tipo = " + ".join(azioni) if azioni else "-"
+        sort_key = min(orari_rilevanti) if orari_rilevanti else pd.NaT
+
+        return pd.Series([tipo, sort_key])
+
+    df_filtrato[['Tipo', 'SortKey']] = df_filtrato.apply(processa_riga, axis=1)
+    return df_filtrato.sort_values(by='SortKey')
+
+# --- STILE PER RIGA (style_manovre) ---
+def style_manovre_riga(row, now=None):
+    styles = [''] * len(row.index)
+    now = now or get_ora_trieste()
+
+    is_past = False
+    if pd.notnull(row['SortKey']):
+        if row['SortKey'] < now:
+            is_past = True
+
+    base_style = 'color: #a0a0a0;' if is_past else ''
+
+    def set_style(col_name, css):
+        try:
+            idx = row.index.get_loc(col_name)
+            styles[idx] = f"{base_style} {css}"
+        except KeyError: pass
+
+    if is_past:
+        for i in range(len(styles)):
+            styles[i] = base_style
+
+    bg_arrivo = '#f2f9f4' if is_past else '#d4edda'
+    col_arrivo = '#a0a0a0' if is_past else '#155724'
+    border_arrivo = '#a0a0a0' if is_past else '#155724'
+
+    bg_partenza = '#fdf2f4' if is_past else '#f8d7da'
+    col_partenza = '#a0a0a0' if is_past else '#721c24'
+    border_partenza = '#a0a0a0' if is_past else '#721c24'
+
+    if 'ARRIVO' in str(row['Tipo']):
+        set_style('ARRIVI', f'background-color: {bg_arrivo}; color: {col_arrivo}; font-weight: bold; border: 2px solid {border_arrivo}')
+
+    if 'PARTENZA' in str(row['Tipo']):
+        set_style('PARTENZE', f'background-color: {bg_partenza}; color: {col_partenza}; font-weight: bold; border: 2px solid {border_partenza}')
+
+    return styles
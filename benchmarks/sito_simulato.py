@@ -0,0 +1,244 @@
+# Sito simulato TMT + TASCO per provare e misurare l'aggiornamento senza rete.
+# Riproduce quello che usa manovre.scraping: la pagina TMT con la tabella navi
+# e, per TASCO, login -> "Access to TIMOS" -> "Terminal Basic Blackboard" ->
+# Export con il file Excel scaricabile. Ogni passaggio ha un ritardo configurabile.
+#
+# Avvio: python -m benchmarks.sito_simulato [--porta 8765] [--righe 300] [--ritardo-login 1.5]
+# poi l'app (o lo scheduler) va puntata sul sito simulato:
+#   MANOVRE_TMT_URL=http://127.0.0.1:8765/it MANOVRE_TASCO_URL=http://127.0.0.1:8765 streamlit run app.py
+# Credenziali TASCO accettate: quelle passate con --utente/--password (default prova/prova).
+import argparse
+import hashlib
+import json
+import random
+import secrets
+import threading
+import time as time_module
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from urllib.parse import parse_qs, urlsplit
+
+from benchmarks.fixtures import genera_export, genera_tmt_html
+
+MIME_XLSX = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+COOKIE_SESSIONE = "TASCOSESSION"
+
+# Ritardi in secondi per passaggio, come li vede il client
+RITARDI_DEFAULT = {
+    "tmt": 0.5,
+    "login": 1.0,
+    "menu": 0.3,
+    "timos": 0.8,
+    "blackboard": 1.5,
+    "export": 1.0,
+}
+
+def _pagina(titolo, corpo):
+    return (
+        f"<!DOCTYPE html><html><head><meta charset='utf-8'><title>{titolo}</title></head>"
+        f"<body>{corpo}</body></html>"
+    ).encode("utf-8")
+
+# --- STATO DEL SITO ---
+# Contenuti generati una volta all'avvio (come un sito che non cambia tra due
+# refresh), sessioni in memoria e contatori delle richieste per i benchmark.
+class SitoSimulato:
+    def __init__(self, righe=300, ritardi=None, variabilita=0.0, tmt_dinamica=False,
+                 utente="prova", password="prova", seme=0):
+        self.ritardi = {**RITARDI_DEFAULT, **(ritardi or {})}
+        self.variabilita = variabilita
+        self.tmt_dinamica = tmt_dinamica
+        self.utente = utente
+        self.password = password
+        self.lock = threading.Lock()
+        self.sessioni = set()
+        self.richieste = {}
+
+        self.tmt_html = genera_tmt_html(righe, seme).encode("utf-8")
+        self.tmt_etag = '"' + hashlib.md5(self.tmt_html).hexdigest() + '"'
+
+        buffer = BytesIO()
+        genera_export(righe, seme).to_excel(buffer, index=False)
+        self.export_xlsx = buffer.getvalue()
+
+    def attendi(self, passaggio):
+        ritardo = self.ritardi.get(passaggio, 0)
+        if self.variabilita:
+            ritardo *= 1 + random.uniform(-self.variabilita, self.variabilita)
+        if ritardo > 0:
+            time_module.sleep(ritardo)
+
+    def conta(self, passaggio):
+        with self.lock:
+            self.richieste[passaggio] = self.richieste.get(passaggio, 0) + 1
+
+    def nuova_sessione(self):
+        token = secrets.token_hex(16)
+        with self.lock:
+            self.sessioni.add(token)
+        return token
+
+    def autenticato(self, cookie_header):
+        for parte in (cookie_header or "").split(";"):
+            nome, _, valore = parte.strip().partition("=")
+            if nome == COOKIE_SESSIONE and valore in self.sessioni:
+                return True
+        return False
+
+    # Variante TMT con la tabella aggiunta da JavaScript dopo il caricamento:
+    # la lettura HTTP non la trova e si passa al browser, come sul sito vero.
+    def tmt_pagina(self):
+        if not self.tmt_dinamica:
+            return self.tmt_html
+        tabella = self.tmt_html.decode("utf-8").split("<body>", 1)[1].rsplit("</body>", 1)[0]
+        script = (
+            "<div id='contenuto'>Caricamento...</div><script>"
+            f"setTimeout(function(){{document.getElementById('contenuto').innerHTML = {json.dumps(tabella)};}}, "
+            f"{int(self.ritardi.get('tmt_js', 0.5) * 1000)});"
+            "</script>"
+        )
+        return _pagina("Trieste Marine Terminal", script)
+
+# --- GESTORE HTTP ---
+class GestoreSito(BaseHTTPRequestHandler):
+    sito = None  # impostato da crea_server
+
+    def log_message(self, formato, *args):
+        pass
+
+    def _invia(self, stato, corpo=b"", tipo="text/html; charset=utf-8", intestazioni=None):
+        self.send_response(stato)
+        self.send_header("Content-Type", tipo)
+        self.send_header("Content-Length", str(len(corpo)))
+        for nome, valore in (intestazioni or {}).items():
+            self.send_header(nome, valore)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(corpo)
+
+    def _redirect(self, percorso, intestazioni=None):
+        self._invia(302, intestazioni={"Location": percorso, **(intestazioni or {})})
+
+    def _autenticato(self):
+        return self.sito.autenticato(self.headers.get("Cookie"))
+
+    def do_GET(self):
+        percorso = urlsplit(self.path).path.rstrip("/") or "/"
+        sito = self.sito
+
+        if percorso in ("/it", "/"):
+            sito.conta("tmt")
+            sito.attendi("tmt")
+            if not sito.tmt_dinamica and self.headers.get("If-None-Match") == sito.tmt_etag:
+                return self._invia(304)
+            return self._invia(200, sito.tmt_pagina(), intestazioni={"ETag": sito.tmt_etag})
+
+        if percorso == "/ui/login":
+            sito.conta("login_form")
+            if self._autenticato():
+                return self._redirect("/ui/home")
+            return self._invia(200, _pagina("TASCO - Login", (
+                "<form method='post' action='/ui/login'>"
+                "<label>Login name</label><input type='text' name='username'>"
+                "<label>Password</label><input type='password' name='password'>"
+                "<button type='submit'>Login</button></form>"
+            )))
+
+        # Da qui in poi serve la sessione
+        if not self._autenticato():
+            return self._redirect("/ui/login")
+
+        if percorso == "/ui/home":
+            sito.conta("menu")
+            sito.attendi("menu")
+            return self._invia(200, _pagina("TASCO", "<ul><li><a href='/timos'>Access to TIMOS</a></li></ul>"))
+
+        if percorso == "/timos":
+            sito.conta("timos")
+            sito.attendi("timos")
+            return self._invia(200, _pagina("TIMOS", "<ul><li><a href='/timos/blackboard'>Terminal Basic Blackboard</a></li></ul>"))
+
+        if percorso == "/timos/blackboard":
+            sito.conta("blackboard")
+            sito.attendi("blackboard")
+            return self._invia(200, _pagina("Terminal Basic Blackboard", (
+                "<a href='/timos/blackboard/export'>Export</a>"
+                "<table><tr><th>Tanker Name</th><th>Berth</th><th>POB</th><th>TLB</th></tr></table>"
+            )))
+
+        if percorso == "/timos/blackboard/export":
+            sito.conta("export")
+            sito.attendi("export")
+            return self._invia(200, sito.export_xlsx, tipo=MIME_XLSX, intestazioni={
+                "Content-Disposition": "attachment; filename=TerminalBasicBlackboard.xlsx",
+            })
+
+        self._invia(404, _pagina("404", "Pagina non trovata"))
+
+    def do_HEAD(self):
+        self.do_GET()
+
+    def do_POST(self):
+        percorso = urlsplit(self.path).path.rstrip("/")
+        if percorso != "/ui/login":
+            return self._invia(404, _pagina("404", "Pagina non trovata"))
+
+        sito = self.sito
+        sito.conta("login")
+        lunghezza = int(self.headers.get("Content-Length", 0))
+        campi = parse_qs(self.rfile.read(lunghezza).decode("utf-8"))
+        sito.attendi("login")
+
+        if campi.get("username", [""])[0] != sito.utente or campi.get("password", [""])[0] != sito.password:
+            return self._invia(200, _pagina("TASCO - Login", "Credenziali errate"))
+
+        token = sito.nuova_sessione()
+        self._redirect("/ui/home", {"Set-Cookie": f"{COOKIE_SESSIONE}={token}; Path=/; HttpOnly"})
+
+# Server in un thread a parte, per usarlo dentro un benchmark. Con porta=0
+# sceglie una porta libera (vedi server.server_address).
+def crea_server(sito, host="127.0.0.1", porta=0):
+    gestore = type("GestoreSitoConfigurato", (GestoreSito,), {"sito": sito})
+    server = ThreadingHTTPServer((host, porta), gestore)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def url_base(server):
+    host, porta = server.server_address[:2]
+    return f"http://{host}:{porta}"
+
+def aggiungi_opzioni(parser):
+    parser.add_argument("--righe", type=int, default=300, help="navi nella tabella TMT e nell'export TASCO")
+    for passaggio, default in RITARDI_DEFAULT.items():
+        parser.add_argument(f"--ritardo-{passaggio}", type=float, default=default, help="secondi")
+    parser.add_argument("--variabilita", type=float, default=0.0, help="variazione casuale dei ritardi (es. 0.3 = ±30%%)")
+    parser.add_argument("--tmt-dinamica", action="store_true", help="tabella TMT creata da JavaScript (obbliga al browser)")
+    parser.add_argument("--utente", default="prova")
+    parser.add_argument("--password", default="prova")
+
+def sito_da_opzioni(args):
+    ritardi = {p: getattr(args, f"ritardo_{p}") for p in RITARDI_DEFAULT}
+    return SitoSimulato(
+        righe=args.righe, ritardi=ritardi, variabilita=args.variabilita,
+        tmt_dinamica=args.tmt_dinamica, utente=args.utente, password=args.password,
+    )
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sito simulato TMT/TASCO per test e benchmark offline")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--porta", type=int, default=8765)
+    aggiungi_opzioni(parser)
+    args = parser.parse_args(argv)
+
+    server = crea_server(sito_da_opzioni(args), args.host, args.porta)
+    base = url_base(server)
+    print(f"Sito simulato su {base}")
+    print(f"  MANOVRE_TMT_URL={base}/it MANOVRE_TASCO_URL={base}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
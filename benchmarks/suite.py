@@ -0,0 +1,198 @@
+# Benchmark offline della pipeline dati: parsing, unione, filtro per turno e stile.
+# Ogni fase viene misurata separatamente su dati sintetici da 10 a 50k righe e
+# i risultati finiscono in un file JSON, per confrontare due commit:
+#
+#   python -m benchmarks.suite                       # salva benchmarks/risultati/<commit>.json
+#   python -m benchmarks.suite --righe 10 1000 --fasi process_tasco_raw
+#   python -m benchmarks.suite --confronta base.json nuovo.json [--soglia 1.2]
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time as time_module
+from datetime import datetime
+from io import StringIO
+
+import numpy as np
+import pandas as pd
+
+from benchmarks import fixtures, riferimento
+from manovre.ingest import leggi_export_tasco
+from manovre.scraping import build_clean_df, parse_tmt_html, process_tasco_raw
+from manovre.turni import classifica_turno, indicizza_turni, style_manovre, vista_turno, griglia_turni, DURATA_TURNO
+
+RIGHE_DEFAULT = [10, 100, 1000, 10000, 50000]
+CARTELLA_RISULTATI = os.path.join(os.path.dirname(__file__), "risultati")
+CENTRO = datetime(2026, 3, 1, 12, 0)
+TURNO = (datetime(2026, 3, 1, 8, 0), datetime(2026, 3, 1, 20, 0))
+# 14 giorni di turni per la griglia di pianificazione
+TURNI_PIANIFICAZIONE = [TURNO[0] + i * DURATA_TURNO for i in range(28)]
+
+# --- PREPARAZIONE DATI ---
+# Calcolati una volta per dimensione e condivisi tra le fasi: ogni fase
+# misura solo il proprio lavoro.
+class Dati:
+    def __init__(self, n_righe, cartella):
+        self.n_righe = n_righe
+        self.cartella = cartella
+        self._cache = {}
+
+    def _get(self, nome, crea):
+        if nome not in self._cache:
+            self._cache[nome] = crea()
+        return self._cache[nome]
+
+    @property
+    def tmt_html(self):
+        return self._get("tmt_html", lambda: fixtures.genera_tmt_html(self.n_righe))
+
+    @property
+    def tasco_xlsx(self):
+        return self._get("tasco_xlsx", lambda: fixtures.scrivi_export_xlsx(self.n_righe, self.cartella))
+
+    @property
+    def tasco_raw(self):
+        return self._get("tasco_raw", lambda: pd.read_excel(self.tasco_xlsx))
+
+    @property
+    def dati_sorgente(self):
+        def crea():
+            df = process_tasco_raw(self.tasco_raw.copy())
+            return {"Vessel": df["Vessel"].to_numpy(), "ETA": df["ETA"].to_numpy(), "ETD": df["ETD"].to_numpy()}, df["Terminal"].to_numpy()
+        return self._get("dati_sorgente", crea)
+
+    @property
+    def snapshot(self):
+        return self._get("snapshot", lambda: fixtures.genera_snapshot(self.n_righe, CENTRO))
+
+    @property
+    def indice(self):
+        return self._get("indice", lambda: indicizza_turni(self.snapshot))
+
+    @property
+    def vista(self):
+        def crea():
+            df = classifica_turno(self.snapshot, *TURNO, ora=CENTRO)
+            return df.rename(columns={"ETA": "ARRIVI", "ETD": "PARTENZE"})
+        return self._get("vista", crea)
+
+# --- FASI ---
+# nome -> funzione(dati) che esegue il lavoro da misurare.
+FASI = {
+    "read_html_lxml": lambda d: pd.read_html(StringIO(d.tmt_html), match="Vessel", flavor="lxml"),
+    "read_html_html5lib": lambda d: pd.read_html(StringIO(d.tmt_html), match="Vessel", flavor="html5lib"),
+    "parse_tmt_html": lambda d: parse_tmt_html(d.tmt_html, flavor=["lxml", "html5lib"]),
+    "read_excel": lambda d: pd.read_excel(d.tasco_xlsx),
+    "leggi_export_tasco": lambda d: leggi_export_tasco(d.tasco_xlsx),
+    "process_tasco_raw": lambda d: process_tasco_raw(d.tasco_raw.copy()),
+    "process_tasco_raw_righe": lambda d: riferimento.process_tasco_raw_righe(d.tasco_raw.copy()),
+    "build_clean_df": lambda d: build_clean_df(*d.dati_sorgente),
+    "concat_fonti": lambda d: pd.concat([d.snapshot, d.snapshot], ignore_index=True),
+    "filtro_turno": lambda d: classifica_turno(d.snapshot, *TURNO, ora=CENTRO),
+    "processa_riga": lambda d: riferimento.classifica_turno_righe(d.snapshot, *TURNO),
+    "indicizza_turni": lambda d: indicizza_turni(d.snapshot),
+    "vista_turno": lambda d: vista_turno(d.indice, TURNO[0], CENTRO),
+    "griglia_turni": lambda d: griglia_turni(d.snapshot),
+    "griglia_turno_per_turno": lambda d: [classifica_turno(d.snapshot, s, s + DURATA_TURNO, ora=CENTRO) for s in TURNI_PIANIFICAZIONE],
+    "style_manovre": lambda d: style_manovre(d.vista),
+    "style_manovre_riga": lambda d: d.vista.apply(riferimento.style_manovre_riga, axis=1, now=CENTRO),
+}
+
+def cronometra(funzione, dati, ripetizioni, limite_singolo=5.0):
+    funzione(dati)  # riscaldamento (e preparazione dei dati in cache)
+    tempi = []
+    for _ in range(ripetizioni):
+        inizio = time_module.perf_counter()
+        funzione(dati)
+        tempi.append(time_module.perf_counter() - inizio)
+        if tempi[-1] > limite_singolo:
+            break
+    return {"min": min(tempi), "mediana": float(np.median(tempi)), "ripetizioni": len(tempi)}
+
+def info_ambiente():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        ).stdout.strip()
+    except Exception:
+        commit = "sconosciuto"
+    return {
+        "commit": commit,
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "piattaforma": platform.platform(),
+        "cpu": os.cpu_count(),
+    }
+
+def esegui(righe, fasi, ripetizioni, limite):
+    risultati = []
+    saltate = set()
+    with tempfile.TemporaryDirectory(prefix="bench_manovre_") as cartella:
+        for n in righe:
+            dati = Dati(n, cartella)
+            for fase in fasi:
+                if fase in saltate:
+                    risultati.append({"fase": fase, "righe": n, "saltata": True})
+                    continue
+                misura = cronometra(FASI[fase], dati, ripetizioni)
+                risultati.append({"fase": fase, "righe": n, **misura})
+                print(f"{fase:<26} {n:>7} righe  {misura['min'] * 1000:>10.2f} ms", flush=True)
+                # Le dimensioni successive richiederebbero troppo: la fase si ferma qui
+                if misura["min"] > limite:
+                    saltate.add(fase)
+    return risultati
+
+# --- CONFRONTO TRA DUE ESECUZIONI ---
+def confronta(file_base, file_nuovo, soglia):
+    with open(file_base) as f:
+        base = json.load(f)
+    with open(file_nuovo) as f:
+        nuovo = json.load(f)
+
+    tempi_base = {(r["fase"], r["righe"]): r["min"] for r in base["risultati"] if not r.get("saltata")}
+    peggiorate = 0
+    print(f"{base['ambiente']['commit']} -> {nuovo['ambiente']['commit']}")
+    print(f"{'fase':<26} {'righe':>7} {'base (ms)':>11} {'nuovo (ms)':>11} {'rapporto':>9}")
+    for r in nuovo["risultati"]:
+        chiave = (r["fase"], r["righe"])
+        if r.get("saltata") or chiave not in tempi_base:
+            continue
+        rapporto = r["min"] / tempi_base[chiave]
+        segno = "  <-- peggiorata" if rapporto > soglia else ""
+        peggiorate += rapporto > soglia
+        print(f"{r['fase']:<26} {r['righe']:>7} {tempi_base[chiave] * 1000:>11.2f} {r['min'] * 1000:>11.2f} {rapporto:>8.2f}x{segno}")
+    return peggiorate
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark offline della pipeline dati")
+    parser.add_argument("--righe", type=int, nargs="+", default=RIGHE_DEFAULT)
+    parser.add_argument("--fasi", nargs="+", choices=sorted(FASI), default=list(FASI))
+    parser.add_argument("--ripetizioni", type=int, default=5)
+    parser.add_argument("--limite", type=float, default=20.0,
+                        help="secondi oltre i quali una fase non viene provata sulle dimensioni successive")
+    parser.add_argument("--output", help="file JSON dei risultati (default: benchmarks/risultati/<commit>.json)")
+    parser.add_argument("--confronta", nargs=2, metavar=("BASE", "NUOVO"), help="confronta due file di risultati")
+    parser.add_argument("--soglia", type=float, default=1.2, help="rapporto oltre il quale una fase è peggiorata")
+    args = parser.parse_args(argv)
+
+    if args.confronta:
+        return 1 if confronta(*args.confronta, args.soglia) else 0
+
+    ambiente = info_ambiente()
+    risultati = esegui(args.righe, args.fasi, args.ripetizioni, args.limite)
+
+    output = args.output or os.path.join(CARTELLA_RISULTATI, f"{ambiente['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({"ambiente": ambiente, "risultati": risultati}, f, indent=2)
+    print(f"Risultati salvati in {output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1 @@
+# Moduli condivisi tra l'interfaccia Streamlit (app.py) e lo scheduler in background.
@@ -0,0 +1,176 @@
+import tempfile
+import threading
+from contextlib import contextmanager
+
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+
+from manovre import tempi
+
+# Risorse che non servono a leggere tabelle e cliccare menu: bloccarle
+# riduce tempo di caricamento e memoria di Chrome.
+URL_BLOCCATI = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.svg", "*.webp", "*.ico",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.css",
+    "*googletagmanager.com*", "*google-analytics.com*", "*doubleclick.net*",
+    "*facebook.net*", "*fonts.googleapis.com*", "*fonts.gstatic.com*",
+    "*hotjar.com*", "*cookiebot.com*", "*iubenda.com*",
+]
+
+# --- BROWSER ---
+def get_driver(blocca_risorse=True, log_rete=False):
+    chrome_options = Options()
+    chrome_options.add_argument("--headless")
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.add_argument("--disable-gpu")
+    chrome_options.add_argument("--window-size=1920,1080")
+    # Non si aspettano immagini e sottorisorse: basta il DOM pronto
+    chrome_options.page_load_strategy = "eager"
+
+    # Cartella di ripiego: ogni export TASCO imposta comunque la propria (Page.setDownloadBehavior)
+    download_dir = tempfile.gettempdir()
+    prefs = {
+        "download.default_directory": download_dir,
+        "download.prompt_for_download": False,
+        "download.directory_upgrade": True,
+        "safebrowsing.enabled": True
+    }
+    if blocca_risorse:
+        prefs["profile.managed_default_content_settings.images"] = 2
+    chrome_options.add_experimental_option("prefs", prefs)
+    # Log di rete: servono solo per scoprire l'URL dell'export TASCO (vedi
+    # _cattura_export_url), gli altri driver non li registrano.
+    if log_rete:
+        chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+
+    service = Service("/usr/bin/chromedriver")
+    driver = webdriver.Chrome(service=service, options=chrome_options)
+
+    if blocca_risorse:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": URL_BLOCCATI})
+    return driver
+
+# --- POOL DI BROWSER CALDI ---
+# I driver restano aperti tra un aggiornamento e l'altro (l'avvio di Chrome è la
+# parte più lenta sui container piccoli). Prima dell'uso si verifica che il
+# browser risponda; dopo `usi_max` utilizzi viene chiuso e ricreato per tenere
+# sotto controllo la memoria. I browser partono al primo utilizzo: di solito le
+# vie HTTP bastano e il pool resta vuoto. Solo i driver chiesti con `log_rete`
+# registrano il traffico di rete.
+class PoolDriver:
+    def __init__(self, dimensione=2, usi_max=20, blocca_risorse=True):
+        self.lock = threading.Lock()
+        self.dimensione = dimensione
+        self.usi_max = usi_max
+        self.blocca_risorse = blocca_risorse
+        self.liberi = []
+        self.usi = {}
+        self.scartati = set()
+        self.con_log = set()
+
+    def configura(self, dimensione=None, usi_max=None, blocca_risorse=None):
+        if dimensione is not None: self.dimensione = dimensione
+        if usi_max is not None: self.usi_max = usi_max
+        if blocca_risorse is not None: self.blocca_risorse = blocca_risorse
+
+    def _crea(self, log_rete=False):
+        with tempi.fase("browser.avvio"):
+            driver = get_driver(blocca_risorse=self.blocca_risorse, log_rete=log_rete)
+        with self.lock:
+            self.usi[id(driver)] = 0
+            if log_rete:
+                self.con_log.add(id(driver))
+        return driver
+
+    def _chiudi(self, driver):
+        with self.lock:
+            self.usi.pop(id(driver), None)
+            self.scartati.discard(id(driver))
+            self.con_log.discard(id(driver))
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    @staticmethod
+    def _sano(driver):
+        try:
+            driver.execute_script("return 1")
+            return True
+        except Exception:
+            return False
+
+    def prendi(self, log_rete=False):
+        with tempi.fase("browser.prendi"):
+            return self._prendi(log_rete)
+
+    # Con `log_rete` serve un driver avviato con il log di rete; senza va bene
+    # qualunque driver libero.
+    def _prendi(self, log_rete=False):
+        while True:
+            with self.lock:
+                adatti = [d for d in self.liberi if not log_rete or id(d) in self.con_log]
+                driver = adatti[-1] if adatti else None
+                if driver is not None:
+                    self.liberi.remove(driver)
+            if driver is None:
+                return self._crea(log_rete)
+            if self._sano(driver):
+                return driver
+            self._chiudi(driver)
+
+    # Eventi di rete accumulati da un driver con il log attivo: scartati prima
+    # di rimetterlo nel pool, altrimenti restano in memoria fino al riciclo.
+    def _svuota_log(self, driver):
+        if id(driver) not in self.con_log:
+            return
+        try:
+            driver.get_log("performance")
+        except Exception:
+            pass
+
+    def restituisci(self, driver, rotto=False):
+        with self.lock:
+            scartato = id(driver) in self.scartati
+            usi = self.usi.get(id(driver), 0) + 1
+            self.usi[id(driver)] = usi
+            tieni = not (rotto or scartato) and usi < self.usi_max and len(self.liberi) < self.dimensione
+        if not tieni:
+            self._chiudi(driver)
+            return
+        self._svuota_log(driver)
+        with self.lock:
+            self.liberi.append(driver)
+
+    # Chiude subito un driver in uso (es. fonte andata in timeout): quando
+    # verrà restituito non tornerà nel pool.
+    def scarta(self, driver):
+        with self.lock:
+            self.scartati.add(id(driver))
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    @contextmanager
+    def driver(self, log_rete=False):
+        driver = self.prendi(log_rete)
+        rotto = False
+        try:
+            yield driver
+        except Exception:
+            rotto = True
+            raise
+        finally:
+            self.restituisci(driver, rotto=rotto)
+
+    def chiudi_tutti(self):
+        with self.lock:
+            liberi, self.liberi = self.liberi, []
+        for driver in liberi:
+            self._chiudi(driver)
+
+pool_driver = PoolDriver()
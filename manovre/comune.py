@@ -0,0 +1,15 @@
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import pandas as pd
+
+# zoneinfo è nella libreria standard (i dati dei fusi arrivano con tzdata,
+# già richiesto da pandas): pytz non serve più
+TZ_TRIESTE = ZoneInfo('Europe/Rome')
+COLONNE = ['Terminal', 'Vessel', 'ETA', 'ETD']
+
+def get_ora_trieste():
+    return datetime.now(TZ_TRIESTE).replace(tzinfo=None)
+
+def df_vuoto():
+    return pd.DataFrame(columns=COLONNE)
@@ -0,0 +1,251 @@
+import argparse
+import gzip
+import hashlib
+import json
+import threading
+import time as time_module
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pandas as pd
+
+from manovre import store
+from manovre.comune import get_ora_trieste
+from manovre.turni import calcola_turno_attuale, classifica_turno, genera_opzioni_future, indicizza_turni, vista_turno, DURATA_TURNO
+
+# --- FEED HTTP DEI MOVIMENTI (sola lettura) ---
+# Avvio: python -m manovre.feed [--db manovre.sqlite] [--porta 8502]
+# Serve i movimenti per turno in JSON o CSV leggendo l'archivio scritto dallo
+# scheduler: non avvia mai uno scraping. Le risposte hanno un ETag (304 con
+# If-None-Match) e vengono compresse con gzip se il client lo accetta.
+#
+#   GET /turni                      turno attuale e prossimi, con i conteggi
+#   GET /turni/attuale[.csv]        movimenti del turno in corso
+#   GET /turni/2026-03-01T20:00     movimenti del turno che inizia a quell'ora (?formato=csv)
+#   GET /storico/2026-03-01T20:00   movimenti del turno secondo lo storico, comprese
+#                                   le navi nel frattempo sparite dai siti (?formato=csv)
+#   GET /movimenti[.csv]            tutti i movimenti dell'archivio
+GZIP_MIN_BYTES = 1024
+CONTROLLO_ARCHIVIO_S = 2.0
+COLONNE_FEED = {"Terminal": "terminal", "Vessel": "vessel", "ETA": "eta", "ETD": "etd", "Tipo": "tipo", "SortKey": "orario"}
+COLONNE_STORICO = {**COLONNE_FEED, "fonte": "fonte", "rilevato_il": "rilevato_il"}
+MIME = {"json": "application/json; charset=utf-8", "csv": "text/csv; charset=utf-8"}
+
+class RichiestaNonValida(Exception):
+    pass
+
+# Ultima versione dell'archivio letta, con l'indice per turno e le risposte già
+# generate per quella versione. Si ricarica solo quando cambiano i dati.
+class FeedManovre:
+    def __init__(self, db_path):
+        self.lock = threading.Lock()
+        self.db_path = db_path
+        self.versione = None
+        self.controllato_il = 0.0
+        self.df = pd.DataFrame()
+        self.indice = {}
+        self.risposte = {}
+
+    def aggiorna(self):
+        with self.lock:
+            if time_module.monotonic() - self.controllato_il < CONTROLLO_ARCHIVIO_S:
+                return
+            self.controllato_il = time_module.monotonic()
+            versione = store.versione(self.db_path)
+            if versione == self.versione:
+                return
+            if self.versione is None or versione is None or versione[1] != self.versione[1]:
+                df, _, _ = store.carica_snapshot(self.db_path)
+                self.df = df
+                self.indice = indicizza_turni(df) if not df.empty else {}
+            self.versione = versione
+            self.risposte = {}
+
+    def aggiornato_il(self):
+        return self.versione[0] if self.versione else None
+
+    # (corpo, tipo, etag, corpo gzip) generati una volta per versione dell'archivio
+    def risposta(self, chiave, genera):
+        with self.lock:
+            chiave = (self.versione, chiave)
+            pronta = self.risposte.get(chiave)
+        if pronta is None:
+            corpo, tipo = genera()
+            pronta = (corpo, tipo, '"' + hashlib.sha1(corpo).hexdigest()[:20] + '"', gzip.compress(corpo))
+            with self.lock:
+                self.risposte[chiave] = pronta
+        return pronta
+
+# --- GENERAZIONE DEI CONTENUTI ---
+def _movimenti(df, colonne_feed=COLONNE_FEED):
+    if df.empty:
+        return pd.DataFrame(columns=list(colonne_feed.values()))
+    colonne = [c for c in colonne_feed if c in df.columns]
+    return df[colonne].rename(columns=colonne_feed)
+
+def _serializza(df, formato, intestazione):
+    if formato == "csv":
+        return df.to_csv(index=False, date_format="%Y-%m-%dT%H:%M:%S").encode("utf-8"), MIME["csv"]
+    righe = json.loads(df.to_json(orient="records", date_format="iso", date_unit="s"))
+    return json.dumps({**intestazione, "movimenti": righe}, ensure_ascii=False).encode("utf-8"), MIME["json"]
+
+def _turno(feed, inizio, formato):
+    fine = inizio + DURATA_TURNO
+    df = _movimenti(vista_turno(feed.indice, inizio, inizio))
+    return _serializza(df, formato, {
+        "turno": {"inizio": inizio.isoformat(), "fine": fine.isoformat()},
+        "aggiornato_il": feed.aggiornato_il(),
+    })
+
+# Ultima versione nota di ogni movimento del turno (store.movimenti_nel_periodo),
+# classificata come le viste dell'indice
+def _storico(feed, inizio, formato):
+    fine = inizio + DURATA_TURNO
+    df = store.movimenti_nel_periodo(feed.db_path, inizio, fine)
+    df = _movimenti(classifica_turno(df, inizio, fine) if not df.empty else df, COLONNE_STORICO)
+    return _serializza(df, formato, {
+        "turno": {"inizio": inizio.isoformat(), "fine": fine.isoformat()},
+        "aggiornato_il": feed.aggiornato_il(),
+    })
+
+def _elenco_turni(feed, ora):
+    inizio, fine, etichetta = calcola_turno_attuale(ora)
+    turni = [(etichetta, inizio, fine)] + [(e, s, f) for e, (s, f) in genera_opzioni_future(ora).items()]
+    elenco = []
+    for etichetta, inizio, fine in turni:
+        df_turno = feed.indice.get(inizio)
+        tipi = df_turno["Tipo"].value_counts() if df_turno is not None else pd.Series(dtype=int)
+        elenco.append({
+            "etichetta": etichetta,
+            "inizio": inizio.isoformat(),
+            "fine": fine.isoformat(),
+            "movimenti": 0 if df_turno is None else len(df_turno),
+            "arrivi": int(tipi.get("ARRIVO", 0) + tipi.get("ARRIVO + PARTENZA", 0)),
+            "partenze": int(tipi.get("PARTENZA", 0) + tipi.get("ARRIVO + PARTENZA", 0)),
+            "url": f"/turni/{inizio:%Y-%m-%dT%H:%M}",
+        })
+    corpo = json.dumps({"aggiornato_il": feed.aggiornato_il(), "turni": elenco}, ensure_ascii=False).encode("utf-8")
+    return corpo, MIME["json"]
+
+def _inizio_turno(percorso, prefisso):
+    try:
+        inizio = datetime.fromisoformat(percorso[len(prefisso):])
+    except ValueError:
+        raise RichiestaNonValida(f"inizio turno non valido, usare ad es. {prefisso}2026-03-01T08:00")
+    if (inizio.hour, inizio.minute) not in ((8, 0), (20, 0)):
+        raise RichiestaNonValida("i turni iniziano alle 08:00 o alle 20:00")
+    return inizio
+
+# Percorso -> (chiave di cache, funzione che genera il contenuto)
+def instrada(feed, percorso, query):
+    percorso, _, estensione = percorso.rstrip("/").partition(".")
+    formato = (query.get("formato", [None])[0] or estensione or "json").lower()
+    if formato not in MIME:
+        raise RichiestaNonValida(f"formato non supportato: {formato}")
+
+    if percorso == "/turni":
+        # L'elenco dipende dall'ora: la chiave cambia a ogni cambio turno
+        ora = get_ora_trieste()
+        return ("turni", calcola_turno_attuale(ora)[0]), lambda: _elenco_turni(feed, ora)
+
+    if percorso == "/turni/attuale":
+        inizio = calcola_turno_attuale(get_ora_trieste())[0]
+        return ("turno", inizio, formato), lambda: _turno(feed, inizio, formato)
+
+    if percorso.startswith("/turni/"):
+        inizio = _inizio_turno(percorso, "/turni/")
+        return ("turno", inizio, formato), lambda: _turno(feed, inizio, formato)
+
+    if percorso.startswith("/storico/"):
+        inizio = _inizio_turno(percorso, "/storico/")
+        return ("storico", inizio, formato), lambda: _storico(feed, inizio, formato)
+
+    if percorso == "/movimenti":
+        return ("movimenti", formato), lambda: _serializza(_movimenti(feed.df), formato, {"aggiornato_il": feed.aggiornato_il()})
+
+    return None, None
+
+# --- SERVER ---
+class GestoreFeed(BaseHTTPRequestHandler):
+    feed = None  # impostato da crea_server
+
+    def log_message(self, formato, *args):
+        pass
+
+    def _errore(self, stato, messaggio):
+        corpo = json.dumps({"errore": messaggio}, ensure_ascii=False).encode("utf-8")
+        self.send_response(stato)
+        self.send_header("Content-Type", MIME["json"])
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        try:
+            self.feed.aggiorna()
+            chiave, genera = instrada(self.feed, url.path, parse_qs(url.query))
+        except RichiestaNonValida as e:
+            return self._errore(400, str(e))
+        except Exception as e:
+            print(f"Errore feed: {e}")
+            return self._errore(500, "archivio non disponibile")
+        if chiave is None:
+            return self._errore(404, "percorso non trovato")
+
+        corpo, tipo, etag, corpo_gzip = self.feed.risposta(chiave, genera)
+        usa_gzip = len(corpo) >= GZIP_MIN_BYTES and "gzip" in self.headers.get("Accept-Encoding", "")
+        if usa_gzip:
+            corpo, etag = corpo_gzip, etag[:-1] + '-gz"'
+
+        intestazioni = {
+            "ETag": etag,
+            "Cache-Control": "no-cache",
+            "Vary": "Accept-Encoding",
+        }
+        if self.feed.aggiornato_il():
+            intestazioni["X-Aggiornato-Il"] = self.feed.aggiornato_il()
+
+        richiesti = [e.strip() for e in self.headers.get("If-None-Match", "").split(",")]
+        if etag in richiesti or "*" in richiesti:
+            self.send_response(304)
+            for nome, valore in intestazioni.items():
+                self.send_header(nome, valore)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", tipo)
+        self.send_header("Content-Length", str(len(corpo)))
+        if usa_gzip:
+            self.send_header("Content-Encoding", "gzip")
+        for nome, valore in intestazioni.items():
+            self.send_header(nome, valore)
+        self.end_headers()
+        self.wfile.write(corpo)
+
+def crea_server(db_path, host="127.0.0.1", porta=8502):
+    gestore = type("GestoreFeedConfigurato", (GestoreFeed,), {"feed": FeedManovre(db_path)})
+    server = ThreadingHTTPServer((host, porta), gestore)
+    server.daemon_threads = True
+    return server
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Feed HTTP in sola lettura dei movimenti per turno")
+    parser.add_argument("--db", default=store.get_db_path(), help="archivio SQLite scritto dallo scheduler")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--porta", type=int, default=8502)
+    args = parser.parse_args(argv)
+
+    server = crea_server(args.db, args.host, args.porta)
+    print(f"Feed movimenti su http://{args.host}:{args.porta} (archivio {args.db})", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+import argparse
+import csv
+import glob
+import importlib.util
+import os
+import time as time_module
+from datetime import datetime
+from io import BytesIO, StringIO
+
+import pandas as pd
+
+# --- LETTURA EXPORT TASCO ---
+# Dell'export servono solo nave, pontile, POB e TLB: si leggono solo quelle
+# colonne (usecols) senza far indovinare i tipi a pandas, con il motore Excel
+# più veloce disponibile. Conta soprattutto quando si rielaborano mesi di
+# export salvati. Oltre all'Excel si accettano gli stessi dati in CSV o HTML.
+COLONNE_TASCO = {"Tanker Name", "Tanker", "Berth", "Pontile", "POB", "TLB"}
+
+# python-calamine (pip install python-calamine) legge xlsx/xls molto più in
+# fretta di openpyxl; se manca si usa il motore predefinito di pandas.
+MOTORE_EXCEL = "calamine" if importlib.util.find_spec("python_calamine") else None
+
+EXCEL = "excel"
+CSV = "csv"
+HTML = "html"
+
+# Stessa pulizia delle intestazioni di process_tasco_raw
+def normalizza_colonna(nome):
+    return str(nome).replace("?", "").replace(".", "").strip()
+
+def _colonna_utile(nome):
+    return normalizza_colonna(nome) in COLONNE_TASCO
+
+def sembra_excel(contenuto):
+    return contenuto[:4] in (b"PK\x03\x04", b"\xd0\xcf\x11\xe0")
+
+# Un export vero ha almeno la colonna TLB (da cui si ricava l'ETA): una pagina
+# di login restituita al posto del file non ce l'ha, o non si legge affatto.
+def sembra_export_tasco(raw_df):
+    return raw_df is not None and any(normalizza_colonna(c) == "TLB" for c in raw_df.columns)
+
+def riconosci_formato(contenuto, nome=""):
+    estensione = os.path.splitext(nome)[1].lower()
+    if estensione in (".xlsx", ".xlsm", ".xls") or sembra_excel(contenuto):
+        return EXCEL
+    if estensione in (".html", ".htm") or contenuto.lstrip()[:1] == b"<":
+        return HTML
+    return CSV
+
+def _leggi_excel(contenuto, motore):
+    return pd.read_excel(BytesIO(contenuto), usecols=_colonna_utile, dtype=object, engine=motore)
+
+def _leggi_csv(contenuto):
+    testo = contenuto.decode("utf-8-sig", errors="replace")
+    try:
+        separatore = csv.Sniffer().sniff(testo[:4096], delimiters=",;\t").delimiter
+    except csv.Error:
+        separatore = ","
+    return pd.read_csv(StringIO(testo), sep=separatore, usecols=_colonna_utile, dtype=str)
+
+def _leggi_html(contenuto):
+    tabelle = pd.read_html(StringIO(contenuto.decode("utf-8", errors="replace")), match="TLB", flavor=["lxml", "html5lib"])
+    raw_df = tabelle[0]
+    return raw_df[[c for c in raw_df.columns if _colonna_utile(c)]]
+
+# `sorgente` può essere un percorso o il contenuto già scaricato (bytes).
+# Restituisce il DataFrame grezzo, pronto per process_tasco_raw.
+def leggi_export_tasco(sorgente, formato=None, motore=MOTORE_EXCEL):
+    if isinstance(sorgente, (bytes, bytearray)):
+        contenuto, nome = bytes(sorgente), ""
+    else:
+        with open(sorgente, "rb") as f:
+            contenuto, nome = f.read(), str(sorgente)
+
+    formato = formato or riconosci_formato(contenuto, nome)
+    if formato == EXCEL:
+        try:
+            return _leggi_excel(contenuto, motore)
+        except ImportError:
+            # Motore indicato ma non installato: si ripiega su quello di pandas
+            return _leggi_excel(contenuto, None)
+    if formato == HTML:
+        return _leggi_html(contenuto)
+    return _leggi_csv(contenuto)
+
+# --- RIELABORAZIONE DI EXPORT SALVATI ---
+# Avvio: python -m manovre.ingest export/*.xlsx [--output storico.csv]
+# Le date TASCO non hanno l'anno: per un export salvato si usa l'anno della
+# data di modifica del file, non quello corrente.
+def carica_export(percorsi, log=print):
+    from manovre.scraping import process_tasco_raw
+
+    frames = []
+    for percorso in percorsi:
+        inizio = time_module.perf_counter()
+        # Un file illeggibile o che non è un export (es. pagina di login salvata)
+        # viene saltato senza fermare gli altri
+        try:
+            raw_df = leggi_export_tasco(percorso)
+            if not sembra_export_tasco(raw_df):
+                log(f"{percorso}: saltato, non è un export TASCO (manca la colonna TLB)")
+                continue
+            anno = datetime.fromtimestamp(os.path.getmtime(percorso)).year
+            df = process_tasco_raw(raw_df, anno=anno)
+        except Exception as e:
+            log(f"{percorso}: errore di lettura o elaborazione ({e})")
+            continue
+        df.insert(0, "File", os.path.basename(percorso))
+        frames.append(df)
+        log(f"{percorso}: {len(df)} navi in {time_module.perf_counter() - inizio:.2f} s")
+    if not frames:
+        return pd.DataFrame(columns=["File", "Terminal", "Vessel", "ETA", "ETD"])
+    return pd.concat(frames, ignore_index=True)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rielabora export TASCO salvati (Excel, CSV o HTML)")
+    parser.add_argument("percorsi", nargs="+", help="file o cartelle di export")
+    parser.add_argument("--output", help="CSV di destinazione (default: solo riepilogo)")
+    args = parser.parse_args(argv)
+
+    percorsi = []
+    for p in args.percorsi:
+        if os.path.isdir(p):
+            percorsi.extend(sorted(f for f in glob.glob(os.path.join(p, "*")) if os.path.isfile(f)))
+        else:
+            percorsi.append(p)
+
+    print(f"Motore Excel: {MOTORE_EXCEL or 'predefinito di pandas'}")
+    inizio = time_module.perf_counter()
+    df = carica_export(percorsi)
+    print(f"{len(percorsi)} file, {len(df)} navi in {time_module.perf_counter() - inizio:.2f} s")
+    if args.output:
+        df.to_csv(args.output, index=False)
+        print(f"Salvato in {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import threading
+import time as time_module
+from datetime import timedelta
+
+from manovre.comune import get_ora_trieste
+
+# --- INTERRUTTORE PER FONTE (circuit breaker) ---
+# Dopo `soglia` errori consecutivi la fonte viene sospesa (aperto) per un tempo
+# che raddoppia a ogni nuova apertura, fino a `attesa_max`. Scaduta l'attesa si
+# lascia passare un solo tentativo di prova (semiaperto): se va bene si torna
+# alla normalità, altrimenti si riapre con l'attesa successiva. Nel frattempo
+# si continuano a mostrare gli ultimi dati buoni della fonte.
+CHIUSO = "chiuso"
+APERTO = "aperto"
+SEMIAPERTO = "semiaperto"
+
+class Interruttore:
+    def __init__(self, fonte, soglia=2, attesa_base=60, attesa_max=1800):
+        self.lock = threading.Lock()
+        self.fonte = fonte
+        self.soglia = soglia
+        self.attesa_base = attesa_base
+        self.attesa_max = attesa_max
+        self.stato = CHIUSO
+        self.errori = 0
+        self.aperture = 0
+        self.riapertura = None
+        self.riapertura_il = None
+        self.ultimo_errore = ""
+
+    # True se la fonte può essere interrogata adesso. Nello stato semiaperto
+    # passa una sola richiesta di prova alla volta.
+    def permesso(self):
+        with self.lock:
+            if self.stato == CHIUSO:
+                return True
+            if self.stato == APERTO and time_module.monotonic() >= self.riapertura:
+                self.stato = SEMIAPERTO
+                return True
+            return False
+
+    def successo(self):
+        with self.lock:
+            self.stato = CHIUSO
+            self.errori = 0
+            self.aperture = 0
+            self.riapertura = None
+            self.riapertura_il = None
+            self.ultimo_errore = ""
+
+    def errore(self, motivo=""):
+        with self.lock:
+            self.errori += 1
+            self.ultimo_errore = motivo
+            if self.stato == SEMIAPERTO or self.errori >= self.soglia:
+                attesa = min(self.attesa_max, self.attesa_base * 2 ** self.aperture)
+                self.aperture += 1
+                self.stato = APERTO
+                self.riapertura = time_module.monotonic() + attesa
+                self.riapertura_il = get_ora_trieste() + timedelta(seconds=attesa)
+
+    def descrivi(self):
+        with self.lock:
+            return {
+                "fonte": self.fonte,
+                "stato": self.stato,
+                "errori": self.errori,
+                "riapertura_il": self.riapertura_il,
+                "ultimo_errore": self.ultimo_errore,
+            }
+
+# --- FONTI ---
+# Un interruttore per fonte e per processo: un sito giù non viene interrogato a
+# ogni aggiornamento. Stanno qui e non in manovre.scraping perché l'interfaccia
+# li legge a ogni run senza dover importare selenium.
+FONTE_TMT = "TMT"
+FONTE_TASCO = "TASCO"
+FONTI = (FONTE_TMT, FONTE_TASCO)
+
+interruttori = {fonte: Interruttore(fonte) for fonte in FONTI}
@@ -0,0 +1,94 @@
+import threading
+from datetime import timedelta
+
+import pandas as pd
+
+from manovre.turni import calcola_turno_attuale, genera_opzioni_future
+
+# --- PREVISIONI METEO (Open-Meteo) ---
+LAT = 45.649  # Trieste
+LON = 13.778
+METEO_URL = f"https://api.open-meteo.com/v1/forecast?latitude={LAT}&longitude={LON}&hourly=temperature_2m,precipitation_probability,weathercode,windspeed_10m,windgusts_10m&timezone=auto"
+KMH_IN_NODI = 0.539957
+RIPROVA_DOPO_ERRORE = timedelta(minutes=5)
+
+def scarica_previsioni():
+    import requests  # solo alla prima richiesta dell'ora: non rallenta l'avvio dell'app
+
+    response = requests.get(METEO_URL, timeout=5)
+    data = response.json()
+    if 'hourly' not in data:
+        return None
+
+    df_meteo = pd.DataFrame(data['hourly'])
+    df_meteo['time'] = pd.to_datetime(df_meteo['time'])
+    return df_meteo
+
+def riepilogo_turno(df_meteo, start_dt, end_dt):
+    start_naive = start_dt.replace(tzinfo=None)
+    end_naive = end_dt.replace(tzinfo=None)
+
+    mask = (df_meteo['time'] >= start_naive) & (df_meteo['time'] <= end_naive)
+    df_turno = df_meteo[mask]
+
+    if df_turno.empty:
+        return None
+
+    t_min = df_turno['temperature_2m'].min()
+    t_max = df_turno['temperature_2m'].max()
+    wind_max_kt = round(df_turno['windspeed_10m'].max() * KMH_IN_NODI, 1)
+    gust_max_kt = round(df_turno['windgusts_10m'].max() * KMH_IN_NODI, 1)
+    code = df_turno['weathercode'].max()
+
+    icon, desc = "☁️", "Variabile"
+    if code == 0: icon, desc = "☀️", "Sereno"
+    elif code in [1, 2, 3]: icon, desc = "⛅", "Nuvoloso"
+    elif code in [45, 48]: icon, desc = "🌫️", "Nebbia"
+    elif code in [51, 53, 55, 61, 63, 65]: icon, desc = "🌧️", "Pioggia"
+    elif code in [71, 73, 75, 77]: icon, desc = "❄️", "Neve"
+    elif code >= 95: icon, desc = "⛈️", "Temporale"
+
+    return {
+        "temp": f"{t_min:.0f}° / {t_max:.0f}°",
+        "vento": f"{wind_max_kt} kt (Raff: {gust_max_kt})",
+        "meteo": f"{icon} {desc}"
+    }
+
+# --- CACHE CONDIVISA ---
+# Una sola richiesta a Open-Meteo per ora di previsione e per processo: il
+# modello si aggiorna ogni ora, quindi al cambio d'ora la cache si invalida.
+# Per il turno attuale e per tutti i turni futuri selezionabili i valori sono
+# calcolati una volta sola: cambiare turno nell'interfaccia è una lettura dal dizionario.
+class CacheMeteo:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.ora_previsione = None
+        self.riepiloghi = {}
+        self.errore_il = None
+
+def get_meteo_turni(ora_riferimento):
+    cache = _cache_meteo
+    ora_previsione = ora_riferimento.replace(minute=0, second=0, microsecond=0)
+
+    with cache.lock:
+        if cache.ora_previsione == ora_previsione:
+            return cache.riepiloghi
+        if cache.errore_il and ora_riferimento - cache.errore_il < RIPROVA_DOPO_ERRORE:
+            return cache.riepiloghi
+
+        try:
+            df_meteo = scarica_previsioni()
+        except Exception:
+            df_meteo = None
+        if df_meteo is None:
+            cache.errore_il = ora_riferimento
+            return cache.riepiloghi
+
+        start, end, _ = calcola_turno_attuale(ora_riferimento)
+        turni = [(start, end)] + list(genera_opzioni_future(ora_riferimento).values())
+        cache.riepiloghi = {turno: riepilogo_turno(df_meteo, *turno) for turno in turni}
+        cache.ora_previsione = ora_previsione
+        cache.errore_il = None
+        return cache.riepiloghi
+
+_cache_meteo = CacheMeteo()
@@ -0,0 +1,86 @@
+import argparse
+import os
+import time as time_module
+import tomllib
+
+from manovre import store, tempi
+from manovre.browser import pool_driver
+from manovre.scraping import scarica_fonti, interruttori
+
+# --- SCHEDULER IN BACKGROUND ---
+# Avvio: python -m manovre.scheduler [--intervallo 300] [--db manovre.sqlite] [--una-volta]
+# Esegue periodicamente lo scraping TMT e TASCO e salva i risultati nell'archivio
+# locale, così l'interfaccia non deve più aspettare il browser.
+
+# Tutta la tabella [tasco] dei secrets (username, password, export_url...),
+# come nell'app; le variabili d'ambiente sostituiscono le singole voci.
+def leggi_credenziali_tasco(secrets_path=".streamlit/secrets.toml"):
+    credenziali = {}
+    if os.path.exists(secrets_path):
+        with open(secrets_path, "rb") as f:
+            credenziali = dict(tomllib.load(f).get("tasco", {}))
+
+    for chiave, variabile in (("username", "TASCO_USERNAME"), ("password", "TASCO_PASSWORD"), ("export_url", "TASCO_EXPORT_URL")):
+        if os.environ.get(variabile):
+            credenziali[chiave] = os.environ[variabile]
+
+    if credenziali.get("username") and credenziali.get("password"):
+        return credenziali
+    return None
+
+def esegui_ciclo(db_path, credenziali, parallelo=True, tmt_http=True):
+    if not credenziali:
+        print("TASCO saltato: credenziali mancanti", flush=True)
+
+    try:
+        with tempi.aggiornamento("scheduler"):
+            risultati = scarica_fonti(credenziali, parallelo=parallelo, tmt_http=tmt_http, log=lambda m: print(m, flush=True))
+            for fonte, (df, nota) in risultati.items():
+                if df.empty:
+                    print(f"{fonte}: nessuna nave, archivio invariato", flush=True)
+                    continue
+                with tempi.fase("archivio", fonte=fonte):
+                    variazioni = store.salva_fonte(db_path, fonte, df, nota)
+                print(f"{fonte}: {len(df)} navi, {len(variazioni)} variazioni", flush=True)
+    finally:
+        # Stato degli interruttori per l'interfaccia (fonti sospese, prossimo tentativo)
+        store.salva_interruttori(db_path, [i.descrivi() for i in interruttori.values()])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scraping periodico TMT/TASCO verso l'archivio locale")
+    parser.add_argument("--intervallo", type=int, default=300, help="secondi tra due scraping")
+    parser.add_argument("--db", default=store.get_db_path(), help="percorso del file SQLite")
+    parser.add_argument("--una-volta", action="store_true", help="esegue un solo ciclo ed esce")
+    parser.add_argument("--sequenziale", action="store_true", help="un solo browser, fonti una dopo l'altra")
+    parser.add_argument("--tmt-solo-browser", action="store_true", help="non prova la lettura HTTP della tabella TMT")
+    parser.add_argument("--usi-max", type=int, default=20, help="utilizzi dopo i quali un browser viene riavviato")
+    parser.add_argument("--carica-tutto", action="store_true", help="non blocca immagini, font, CSS e script di terze parti")
+    parser.add_argument("--log-tempi", default=tempi.get_log_path(), help="log JSONL dei tempi per fase (vuoto = disattivato)")
+    args = parser.parse_args(argv)
+
+    tempi.configura(args.log_tempi)
+
+    credenziali = leggi_credenziali_tasco()
+    pool_driver.configura(
+        dimensione=1 if args.sequenziale else 2,
+        usi_max=args.usi_max,
+        blocca_risorse=not args.carica_tutto,
+    )
+
+    try:
+        while True:
+            inizio = time_module.monotonic()
+            try:
+                esegui_ciclo(args.db, credenziali, parallelo=not args.sequenziale, tmt_http=not args.tmt_solo_browser)
+            except Exception as e:
+                print(f"Errore ciclo scraping: {e}", flush=True)
+
+            if args.una_volta:
+                break
+            attesa = args.intervallo - (time_module.monotonic() - inizio)
+            time_module.sleep(max(attesa, 0))
+    finally:
+        pool_driver.chiudi_tutti()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,690 @@
+import os
+import json
+import queue
+import tempfile
+import threading
+import time as time_module
+from concurrent import futures
+from datetime import datetime
+from io import StringIO
+from urllib.parse import urlsplit
+
+import numpy as np
+import pandas as pd
+import requests
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.common.keys import Keys
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+
+from manovre import tempi
+from manovre.ingest import leggi_export_tasco, sembra_export_tasco
+from manovre.interruttori import FONTE_TMT, FONTE_TASCO, interruttori
+from manovre.browser import pool_driver
+from manovre.comune import get_ora_trieste, df_vuoto
+
+# --- LOGICA DI RICOSTRUZIONE ---
+def build_clean_df(source_data, terminal_input):
+    n_rows = len(source_data.get('Vessel', []))
+
+    if isinstance(terminal_input, (list, np.ndarray)):
+        if len(terminal_input) == n_rows:
+            terminal = terminal_input
+        else:
+            terminal = ["SIOT (N.D.)"] * n_rows
+    else:
+        terminal = [terminal_input] * n_rows
+
+    return pd.DataFrame({
+        'Terminal': terminal,
+        'Vessel': source_data.get('Vessel', [""] * n_rows),
+        'ETA': source_data.get('ETA', [pd.NaT] * n_rows),
+        'ETD': source_data.get('ETD', [pd.NaT] * n_rows),
+    })
+
+# --- ATTESE DEL BROWSER ---
+# Niente pause fisse: si aspetta la condizione che serve davvero (tabella
+# presente, pagina cambiata, link cliccabile) con un timeout adattivo basato
+# sulle attese recenti dello stesso passaggio (vedi tempi.LatenzeRecenti).
+def _attendi(driver, passaggio, condizione, massimo=20):
+    timeout = tempi.latenze.timeout(passaggio, massimo)
+    inizio = time_module.monotonic()
+    try:
+        risultato = WebDriverWait(driver, timeout, poll_frequency=0.1).until(condizione)
+    except TimeoutException:
+        tempi.latenze.scaduto(passaggio, timeout)
+        raise
+    tempi.latenze.osserva(passaggio, time_module.monotonic() - inizio)
+    return risultato
+
+# --- 1. SCRAPING TMT ---
+# Gli indirizzi dei siti si possono sostituire con variabili d'ambiente, ad
+# esempio per puntare al sito simulato di benchmarks/sito_simulato.py.
+TMT_URL = os.environ.get("MANOVRE_TMT_URL", "https://www.trieste-marine-terminal.com/it")
+XPATH_TMT_TABELLA = "//table//*[self::th or self::td][contains(normalize-space(.), 'Vessel')]"
+
+# Restituisce None se nella pagina non c'è la tabella delle navi.
+def parse_tmt_html(html, flavor='html5lib'):
+    try:
+        dfs = pd.read_html(StringIO(html), match="Vessel", flavor=flavor)
+    except ValueError:
+        return None
+    if len(dfs) == 0:
+        return None
+
+    raw_df = dfs[0]
+    raw_df.columns = [str(c).strip() for c in raw_df.columns]
+
+    vessels = raw_df['Vessel'].tolist() if 'Vessel' in raw_df.columns else []
+
+    if 'ETB' in raw_df.columns:
+        etas = pd.to_datetime(raw_df['ETB'], dayfirst=True, errors='coerce').tolist()
+    else:
+        etas = [pd.NaT] * len(vessels)
+
+    if 'ETD' in raw_df.columns:
+        etds = pd.to_datetime(raw_df['ETD'], dayfirst=True, errors='coerce').tolist()
+    else:
+        etds = [pd.NaT] * len(vessels)
+
+    data_dict = {'Vessel': vessels, 'ETA': etas, 'ETD': etds}
+    return build_clean_df(data_dict, 'TMT (Molo VII)')
+
+def fetch_tmt_data(driver):
+    try:
+        with tempi.fase("tmt.pagina") as fase:
+            driver.get(TMT_URL)
+            # La tabella può arrivare dopo il DOM (JavaScript): si legge appena c'è
+            try:
+                _attendi(driver, "tmt.tabella", EC.presence_of_element_located((By.XPATH, XPATH_TMT_TABELLA)), massimo=15)
+            except TimeoutException:
+                print("Errore TMT: tabella navi non comparsa nella pagina")
+                fase["ok"] = False
+            html = driver.page_source
+        with tempi.fase("tmt.parsing") as fase:
+            df = parse_tmt_html(html)
+            fase["righe"] = 0 if df is None else len(df)
+        if df is not None:
+            return df
+    except Exception as e:
+        print(f"Errore TMT: {e}")
+
+    return df_vuoto()
+
+# Percorso veloce senza browser: una sessione HTTP riutilizzata tra gli
+# aggiornamenti, con richieste condizionali (ETag / Last-Modified). Se il sito
+# risponde 304 si riusa l'ultima tabella letta.
+class CacheHttpTmt:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.sessione = requests.Session()
+        self.sessione.headers["User-Agent"] = "Mozilla/5.0 (X11; Linux x86_64) monitor-manovre"
+        self.etag = None
+        self.last_modified = None
+        self.df = None
+
+_cache_http_tmt = CacheHttpTmt()
+
+# Restituisce None quando la tabella non è nell'HTML servito (o il sito non
+# risponde): in quel caso si passa a Selenium.
+def fetch_tmt_http(timeout=10):
+    cache = _cache_http_tmt
+    with cache.lock, tempi.fase("tmt.http") as fase:
+        headers = {}
+        if cache.df is not None:
+            if cache.etag: headers["If-None-Match"] = cache.etag
+            if cache.last_modified: headers["If-Modified-Since"] = cache.last_modified
+
+        try:
+            resp = cache.sessione.get(TMT_URL, headers=headers, timeout=timeout)
+            fase["stato_http"] = resp.status_code
+            if resp.status_code == 304 and cache.df is not None:
+                return cache.df
+            resp.raise_for_status()
+        except requests.RequestException as e:
+            print(f"Errore TMT (HTTP): {e}")
+            fase.update(ok=False, errore=str(e))
+            return None
+
+        df = parse_tmt_html(resp.text, flavor=['lxml', 'html5lib'])
+        if df is None or df.empty:
+            fase["ok"] = False
+            return None
+        fase["righe"] = len(df)
+
+        cache.etag = resp.headers.get("ETag")
+        cache.last_modified = resp.headers.get("Last-Modified")
+        cache.df = df
+        return df
+
+# --- 2. SCRAPING TASCO ---
+TASCO_BASE_URL = os.environ.get("MANOVRE_TASCO_URL", "https://tasco.tal-oil.com")
+TASCO_LOGIN_URL = TASCO_BASE_URL + "/ui/login"
+TASCO_SESSIONE_MAX_S = 4 * 3600
+
+XPATH_TIMOS = "//*[contains(text(), 'Access to TIMOS')]"
+XPATH_BLACKBOARD = "//*[contains(text(), 'Terminal Basic Blackboard')]"
+XPATH_EXPORT = "//*[contains(text(), 'Export')]"
+
+# Sessione autenticata condivisa tra gli aggiornamenti: i cookie del login e,
+# quando noto, l'URL dell'export Excel. Si rifà il login solo a sessione scaduta.
+class SessioneTasco:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.cookies = None
+        self.ottenuta_il = None
+        self.export_url = None
+
+    def valida(self):
+        return self.cookies is not None and time_module.monotonic() - self.ottenuta_il < TASCO_SESSIONE_MAX_S
+
+    def salva(self, cookies):
+        self.cookies = cookies
+        self.ottenuta_il = time_module.monotonic()
+
+    def invalida(self):
+        self.cookies = None
+
+_sessione_tasco = SessioneTasco()
+
+# Export richiesto direttamente via HTTP con i cookie della sessione salvata.
+# Restituisce (DataFrame, nota) oppure None se serve passare dal browser.
+def fetch_tasco_http(credenziali, log=None):
+    sessione = _sessione_tasco
+    export_url = credenziali.get("export_url") or sessione.export_url
+    if not export_url or not sessione.valida():
+        return None
+
+    if log: log("♻️ Riuso sessione SIOT, export diretto...")
+    # Qualunque errore (cookie non validi, rete, file illeggibile) fa ripiegare
+    # sul browser con un nuovo login, mai fallire la fonte.
+    with tempi.fase("tasco.http") as fase:
+        try:
+            # Un cookie senza dominio vale per l'host dell'export
+            host = urlsplit(export_url).hostname or ""
+            with requests.Session() as http:
+                for c in sessione.cookies:
+                    http.cookies.set(c["name"], c["value"], domain=c.get("domain") or host, path=c.get("path") or "/")
+                resp = http.get(export_url, timeout=30, allow_redirects=False)
+        except Exception as e:
+            print(f"Errore TASCO (HTTP): {e}")
+            fase.update(ok=False, errore=str(e))
+            sessione.invalida()
+            return None
+
+        fase["stato_http"] = resp.status_code
+        if resp.status_code != 200:
+            fase["ok"] = False
+
+    # Sessione scaduta: il sito rimanda al login (redirect) oppure risponde 200
+    # con una pagina che non è un export. Excel, CSV o HTML vanno tutti bene.
+    df = None
+    if resp.status_code == 200:
+        with tempi.fase("tasco.parsing") as fase:
+            try:
+                raw_df = leggi_export_tasco(resp.content)
+                if sembra_export_tasco(raw_df):
+                    df = process_tasco_raw(raw_df)
+                    fase["righe"] = len(df)
+                else:
+                    fase.update(ok=False, errore="risposta senza export")
+            except Exception as e:
+                print(f"Errore TASCO (export HTTP): {e}")
+                fase.update(ok=False, errore=str(e))
+                df = None
+
+    if df is None:
+        if log: log("↪️ Sessione SIOT scaduta, nuovo accesso dal browser")
+        sessione.invalida()
+        return None
+
+    if log: log("✅ File ricevuto via HTTP")
+    return df, "File elaborato: export HTTP (sessione riutilizzata)"
+
+# Cerca nei log di rete del browser la risposta generata dal click su Export
+# (Excel o CSV, oppure qualunque file servito come allegato, anche HTML): se è
+# una GET si può ripetere via HTTP ai prossimi aggiornamenti.
+MIME_EXPORT = ("excel", "spreadsheet", "csv")
+
+def _e_export(risposta):
+    if any(m in risposta.get("mimeType", "") for m in MIME_EXPORT):
+        return True
+    intestazioni = {k.lower(): str(v) for k, v in risposta.get("headers", {}).items()}
+    return "attachment" in intestazioni.get("content-disposition", "").lower()
+
+def _cattura_export_url(driver):
+    try:
+        voci = driver.get_log("performance")
+    except Exception:
+        return None
+
+    metodi = {}
+    for voce in voci:
+        try:
+            msg = json.loads(voce["message"])["message"]
+        except (KeyError, ValueError):
+            continue
+        params = msg.get("params", {})
+        if msg.get("method") == "Network.requestWillBeSent":
+            metodi[params.get("requestId")] = params.get("request", {}).get("method")
+        elif msg.get("method") == "Network.responseReceived":
+            resp = params.get("response", {})
+            if _e_export(resp) and metodi.get(params.get("requestId")) == "GET":
+                return resp.get("url")
+    return None
+
+def _login_tasco(driver, credenziali, log):
+    sessione = _sessione_tasco
+
+    # Con cookie ancora validi (o un browser già autenticato) la pagina di
+    # login porta direttamente al menu e il form non compare.
+    if sessione.valida():
+        driver.get(TASCO_BASE_URL)
+        for c in sessione.cookies:
+            try:
+                driver.add_cookie({k: c[k] for k in ("name", "value", "path", "domain", "secure", "httpOnly", "expiry") if k in c})
+            except Exception:
+                pass
+
+    driver.get(TASCO_LOGIN_URL)
+    trovato = _attendi(driver, "tasco.pagina_login", EC.any_of(
+        EC.presence_of_element_located((By.CSS_SELECTOR, "input[type='password']")),
+        EC.element_to_be_clickable((By.XPATH, XPATH_TIMOS)),
+    ))
+    if trovato.get_attribute("type") != "password":
+        log("♻️ Sessione SIOT ancora attiva")
+        return
+
+    pass_input = trovato
+    try:
+        user_input = driver.find_element(By.XPATH, "//input[preceding::*[contains(text(), 'Login name')]]")
+    except:
+        user_input = driver.find_element(By.CSS_SELECTOR, "input[type='text']")
+
+    user_input.clear()
+    user_input.send_keys(credenziali["username"])
+    pass_input.clear()
+    pass_input.send_keys(credenziali["password"])
+    pass_input.send_keys(Keys.RETURN)
+    # Login concluso quando il form viene sostituito dalla pagina successiva
+    _attendi(driver, "tasco.login", EC.any_of(
+        EC.staleness_of(pass_input),
+        EC.element_to_be_clickable((By.XPATH, XPATH_TIMOS)),
+    ))
+    log("✅ Login effettuato")
+
+# Chrome scrive il download come .crdownload e lo rinomina solo a file completo:
+# si aspetta il nome definitivo e, per sicurezza, una dimensione stabile tra due
+# controlli ravvicinati. `timeout` vale per un download fermo: finché i file
+# nella cartella crescono l'attesa si prolunga, fino a `massimo` secondi in tutto.
+ESTENSIONI_PARZIALI = (".crdownload", ".tmp", ".part")
+
+def attendi_download(cartella, timeout=15, intervallo=0.1, massimo=120):
+    inizio = time_module.monotonic()
+    scadenza = inizio + timeout
+    dimensione_precedente = None
+    totale_precedente = 0
+    while time_module.monotonic() < scadenza:
+        nomi = os.listdir(cartella)
+        try:
+            dimensioni = {n: os.path.getsize(os.path.join(cartella, n)) for n in nomi}
+        except OSError:
+            # File rinominato tra listdir e getsize: si riguarda al giro dopo
+            time_module.sleep(intervallo)
+            continue
+
+        completi = [n for n in nomi if not n.endswith(ESTENSIONI_PARZIALI)]
+        if completi and len(completi) == len(nomi):
+            dimensione = dimensioni[completi[0]]
+            if dimensione > 0 and dimensione == dimensione_precedente:
+                return os.path.join(cartella, completi[0])
+            dimensione_precedente = dimensione
+
+        totale = sum(dimensioni.values())
+        if totale > totale_precedente:
+            scadenza = max(scadenza, min(inizio + massimo, time_module.monotonic() + timeout))
+        totale_precedente = totale
+        time_module.sleep(intervallo)
+    return None
+
+# Restituisce (DataFrame, nota) dove la nota descrive il file elaborato.
+# `annullata` (threading.Event) è impostata da chi ha già rinunciato alla fonte
+# (timeout): in quel caso la sessione non viene salvata.
+def fetch_tasco_data(driver, credenziali, log=None, annullata=None):
+    def _log(msg):
+        if log:
+            log(msg)
+
+    sessione = _sessione_tasco
+
+    try:
+        # LOGIN
+        _log("🔑 Accesso SIOT in corso...")
+        with sessione.lock, tempi.fase("tasco.login"):
+            _login_tasco(driver, credenziali, _log)
+
+        # NAVIGAZIONE
+        _log("🧭 Navigazione menu TIMOS...")
+        with tempi.fase("tasco.menu") as fase:
+            try:
+                btn_timos = _attendi(driver, "tasco.timos", EC.element_to_be_clickable((By.XPATH, XPATH_TIMOS)))
+                btn_timos.click()
+                btn_bb = _attendi(driver, "tasco.blackboard", EC.element_to_be_clickable((By.XPATH, XPATH_BLACKBOARD)))
+                btn_bb.click()
+                # Pagina cambiata (o, se il menu non ricarica la pagina, Export già visibile)
+                _attendi(driver, "tasco.tabella", EC.any_of(
+                    EC.staleness_of(btn_bb),
+                    EC.element_to_be_clickable((By.XPATH, XPATH_EXPORT)),
+                ))
+                _log("✅ Tabella raggiunta")
+            except:
+                _log("❌ Errore navigazione menu")
+                sessione.invalida()
+                fase["ok"] = False
+                return df_vuoto(), ""
+
+        # Arrivati al menu la sessione è buona: la si conserva per i prossimi aggiornamenti
+        if annullata is not None and annullata.is_set():
+            return df_vuoto(), ""
+        sessione.salva(driver.get_cookies())
+
+        # EXPORT
+        # Ogni aggiornamento scarica in una propria cartella temporanea: niente
+        # file nella cartella di lavoro e nessun conflitto tra refresh concorrenti.
+        _log("📥 Scaricamento file Excel...")
+        with tempfile.TemporaryDirectory(prefix="tasco_") as cartella:
+            driver.execute_cdp_cmd("Page.setDownloadBehavior", {"behavior": "allow", "downloadPath": cartella})
+
+            with tempi.fase("tasco.export") as fase:
+                try:
+                    btn_export = _attendi(driver, "tasco.export", EC.element_to_be_clickable((By.XPATH, XPATH_EXPORT)))
+                    btn_export.click()
+                except:
+                    _log("❌ Tasto Export non trovato")
+                    fase.update(ok=False, errore="tasto Export non trovato")
+                    return df_vuoto(), ""
+
+                # DOWNLOAD
+                timeout = tempi.latenze.timeout("tasco.download", 30)
+                inizio = time_module.monotonic()
+                file_scaricato = attendi_download(cartella, timeout=timeout)
+                if file_scaricato:
+                    tempi.latenze.osserva("tasco.download", time_module.monotonic() - inizio)
+                else:
+                    tempi.latenze.scaduto("tasco.download", timeout)
+                    _log("❌ Timeout download")
+                    fase.update(ok=False, errore="timeout download")
+                    return df_vuoto(), ""
+
+            export_url = _cattura_export_url(driver) if _serve_log_rete(FONTE_TASCO, credenziali) else None
+            if export_url and not (annullata is not None and annullata.is_set()):
+                sessione.export_url = export_url
+
+            _log(f"✅ File ricevuto: {os.path.basename(file_scaricato)}")
+            nota = f"File elaborato: {os.path.basename(file_scaricato)}"
+
+            with tempi.fase("tasco.parsing") as fase:
+                raw_df = leggi_export_tasco(file_scaricato)
+                df = process_tasco_raw(raw_df)
+                fase["righe"] = len(df)
+
+        return df, nota
+
+    except Exception as e:
+        _log(f"❌ Errore critico TASCO: {str(e)}")
+        sessione.invalida()
+        return df_vuoto(), ""
+
+# Normalizzazione colonna per colonna (niente .apply per cella): conta quando
+# si rielaborano export storici con migliaia di righe.
+def format_berth_col(col):
+    testo = col.astype(str)
+    pulito = testo.str.strip()
+    vuoto = col.isna() | (pulito == "")
+
+    numeri = pd.to_numeric(col.where(~vuoto), errors='coerce').astype(float)
+    interi = np.isfinite(numeri) & ~vuoto
+
+    berth = testo.copy()
+    berth[interi] = numeri[interi].astype('int64').astype(str)
+    berth[vuoto] = "N.D."
+    return berth
+
+# Stessa risoluzione che pandas assegna a una lista di datetime (ns in pandas 2,
+# us/s in pandas 3), così il risultato non dipende dal formato delle celle.
+DTYPE_DATE = pd.Series([datetime(2000, 1, 1)]).dtype
+DTYPE_SOLO_NAT = pd.Series([pd.NaT]).dtype
+
+# Date TASCO nel formato "gg.mm." senza anno: si aggiunge l'anno corrente.
+# Quello che non rispetta il formato viene interpretato valore per valore.
+def parse_tasco_date_col(col, anno):
+    testo = col.astype(str).str.strip()
+    vuoto = (testo == "") | (testo.str.lower() == "nan")
+
+    con_anno = ~vuoto & (testo.str.count(r"\.") >= 2)
+    date = pd.to_datetime(testo.where(con_anno) + str(anno), format="%d.%m.%Y", errors='coerce')
+
+    resto = ~vuoto & date.isna()
+    if resto.any():
+        date = date.where(~resto, pd.to_datetime(testo.where(resto), format="mixed", errors='coerce'))
+    return date.astype(DTYPE_DATE if date.notna().any() else DTYPE_SOLO_NAT)
+
+# `anno` serve a completare le date "gg.mm." (default: anno corrente)
+def process_tasco_raw(raw_df, anno=None):
+    raw_df = raw_df.dropna(how='all')
+    raw_df.columns = [str(c).replace("?","").replace(".","").strip() for c in raw_df.columns]
+    n_rows = len(raw_df)
+    if n_rows == 0:
+        return df_vuoto()
+
+    v_col = None
+    if 'Tanker Name' in raw_df.columns: v_col = 'Tanker Name'
+    elif 'Tanker' in raw_df.columns: v_col = 'Tanker'
+    vessels = raw_df[v_col].to_numpy() if v_col else ["Sconosciuto"] * n_rows
+
+    b_col = None
+    if 'Berth' in raw_df.columns: b_col = 'Berth'
+    elif 'Pontile' in raw_df.columns: b_col = 'Pontile'
+
+    if b_col:
+        terminal_labels = ("SIOT (" + format_berth_col(raw_df[b_col]) + ")").to_numpy()
+    else:
+        terminal_labels = ["SIOT (N.D.)"] * n_rows
+
+    current_year = anno or get_ora_trieste().year
+
+    if 'POB' in raw_df.columns:
+        etas = parse_tasco_date_col(raw_df['POB'], current_year).to_numpy()
+    else:
+        etas = [pd.NaT] * n_rows
+
+    if 'TLB' in raw_df.columns:
+        tlb = parse_tasco_date_col(raw_df['TLB'], current_year)
+        etds = (tlb - pd.Timedelta(minutes=30)).astype(tlb.dtype).to_numpy()
+    else:
+        etds = [pd.NaT] * n_rows
+
+    data_dict = {'Vessel': vessels, 'ETA': etas, 'ETD': etds}
+    return build_clean_df(data_dict, terminal_labels)
+
+# --- 3. AGGIORNAMENTO DI TUTTE LE FONTI ---
+# Nomi delle fonti e interruttori sono in manovre.interruttori
+TIMEOUT_FONTE = {FONTE_TMT: 60, FONTE_TASCO: 120}
+
+# Il log di rete del browser serve solo finché l'URL dell'export TASCO non è noto
+def _serve_log_rete(fonte, credenziali):
+    if fonte != FONTE_TASCO or not credenziali:
+        return False
+    return not (credenziali.get("export_url") or _sessione_tasco.export_url)
+
+def _scarica_fonte(fonte, driver, credenziali, log, annullata=None):
+    with tempi.fase(f"{fonte.lower()}.browser") as fase:
+        if fonte == FONTE_TMT:
+            esito = fetch_tmt_data(driver), ""
+        else:
+            esito = fetch_tasco_data(driver, credenziali, log=log, annullata=annullata)
+        fase["righe"] = len(esito[0])
+    return esito
+
+# Fonti da interrogare: TASCO solo con le credenziali, nessuna fonte sospesa
+# dal proprio interruttore (per quelle restano validi gli ultimi dati buoni).
+def _fonti_richieste(credenziali, log):
+    fonti = []
+    for fonte in ([FONTE_TMT, FONTE_TASCO] if credenziali else [FONTE_TMT]):
+        if interruttori[fonte].permesso():
+            fonti.append(fonte)
+        else:
+            riapertura = interruttori[fonte].descrivi()["riapertura_il"]
+            log(f"⛔ {fonte} sospeso dopo errori ripetuti, nuovo tentativo alle {riapertura:%H:%M}")
+    return fonti
+
+# Una fonte senza navi conta come errore: i siti non sono mai vuoti davvero,
+# una tabella vuota vuol dire pagina non caricata o sessione non valida.
+def _registra_esito(fonte, df, motivo="nessuna nave letta"):
+    if df.empty:
+        interruttori[fonte].errore(motivo)
+    else:
+        interruttori[fonte].successo()
+
+# Tentativo senza browser per ogni fonte: tabella TMT via HTTP, export TASCO
+# con la sessione salvata. None se serve il browser.
+def _fonte_via_http(fonte, credenziali, log, tmt_http):
+    if fonte == FONTE_TMT:
+        if not tmt_http:
+            return None
+        df = fetch_tmt_http()
+        if df is None:
+            log("↪️ Tabella TMT non presente nell'HTML, uso il browser")
+            return None
+        return df, ""
+    return fetch_tasco_http(credenziali, log)
+
+# Restituisce {fonte: (DataFrame, nota)}; le fonti sospese dal loro interruttore
+# non compaiono. Se `on_risultato` è indicato viene chiamato appena una fonte
+# termina, senza aspettare le altre.
+# Ogni fonte prova prima la via HTTP (tabella TMT se `tmt_http`, export TASCO
+# con la sessione salvata) e usa il browser solo se non basta.
+def scarica_fonti(credenziali, parallelo=False, timeout=None, log=None, on_risultato=None, tmt_http=True):
+    def _log(msg):
+        if log:
+            log(msg)
+
+    if parallelo:
+        return _scarica_fonti_parallelo(credenziali, timeout or TIMEOUT_FONTE, _log, on_risultato, tmt_http)
+
+    # Come nel parallelo, l'errore di una fonte (anche all'avvio del browser) la
+    # rende vuota senza fermare le altre, e passa sempre dal suo interruttore.
+    risultati = {}
+
+    def concludi(fonte, esito, motivo="nessuna nave letta"):
+        risultati[fonte] = esito
+        _registra_esito(fonte, esito[0], motivo)
+        if on_risultato:
+            on_risultato(fonte, *esito)
+
+    def fallita(fonte, e):
+        _log(f"❌ Errore {fonte}: {e}")
+        concludi(fonte, (df_vuoto(), ""), str(e))
+
+    con_browser = []
+    for fonte in _fonti_richieste(credenziali, _log):
+        try:
+            esito = _fonte_via_http(fonte, credenziali, _log, tmt_http)
+        except Exception as e:
+            fallita(fonte, e)
+            continue
+        if esito is None:
+            con_browser.append(fonte)
+            continue
+        _log(f"✅ {fonte} completato via HTTP ({len(esito[0])} navi trovate)")
+        concludi(fonte, esito)
+    if not con_browser:
+        return risultati
+
+    # Un driver del pool per fonte: se una fonte lo rompe viene scartato, altrimenti
+    # la fonte successiva ritrova lo stesso browser già avviato.
+    _log("🔌 Avvio Browser remoto...")
+    for fonte in con_browser:
+        try:
+            with pool_driver.driver(log_rete=_serve_log_rete(fonte, credenziali)) as driver:
+                esito = _scarica_fonte(fonte, driver, credenziali, _log)
+        except Exception as e:
+            fallita(fonte, e)
+            continue
+        _log(f"✅ {fonte} completato ({len(esito[0])} navi trovate)")
+        concludi(fonte, esito)
+    return risultati
+
+# Un browser del pool per fonte, ognuno nel proprio thread. I messaggi dei thread passano
+# da una coda e vengono scritti dal thread chiamante (Streamlit non accetta
+# scritture da altri thread). Allo scadere del timeout di una fonte il suo
+# browser viene chiuso e la fonte risulta vuota.
+def _scarica_fonti_parallelo(credenziali, timeout, log, on_risultato, tmt_http):
+    fonti = _fonti_richieste(credenziali, log)
+    if not fonti:
+        return {}
+    messaggi = queue.Queue()
+    driver_attivi = {}
+    # Impostato allo scadere del timeout: il thread della fonte, che non si può
+    # interrompere, non prende altri browser e non salva la sessione TASCO.
+    annullate = {fonte: threading.Event() for fonte in fonti}
+
+    def worker(fonte):
+        esito = _fonte_via_http(fonte, credenziali, messaggi.put, tmt_http)
+        if esito is not None:
+            return esito
+        if annullate[fonte].is_set():
+            return df_vuoto(), ""
+        with pool_driver.driver(log_rete=_serve_log_rete(fonte, credenziali)) as driver:
+            driver_attivi[fonte] = driver
+            try:
+                return _scarica_fonte(fonte, driver, credenziali, messaggi.put, annullate[fonte])
+            finally:
+                driver_attivi.pop(fonte, None)
+
+    def svuota_messaggi():
+        while not messaggi.empty():
+            log(messaggi.get_nowait())
+
+    log(f"🔌 Avvio {len(fonti)} fonti in parallelo...")
+    inizio = time_module.monotonic()
+    risultati = {}
+    executor = futures.ThreadPoolExecutor(max_workers=len(fonti))
+    in_corso = {executor.submit(worker, fonte): fonte for fonte in fonti}
+    try:
+        while in_corso:
+            scadenze = {f: inizio + timeout.get(fonte, 120) for f, fonte in in_corso.items()}
+            attesa = max(0.0, min(min(scadenze.values()) - time_module.monotonic(), 0.5))
+            completati, _ = futures.wait(in_corso, timeout=attesa, return_when=futures.FIRST_COMPLETED)
+            svuota_messaggi()
+
+            for future in completati:
+                fonte = in_corso.pop(future)
+                try:
+                    risultati[fonte] = future.result()
+                    _registra_esito(fonte, risultati[fonte][0])
+                    log(f"✅ {fonte} completato ({len(risultati[fonte][0])} navi trovate)")
+                except Exception as e:
+                    log(f"❌ Errore {fonte}: {e}")
+                    risultati[fonte] = (df_vuoto(), "")
+                    _registra_esito(fonte, risultati[fonte][0], str(e))
+                if on_risultato:
+                    on_risultato(fonte, *risultati[fonte])
+
+            ora = time_module.monotonic()
+            for future in [f for f in in_corso if scadenze[f] <= ora]:
+                fonte = in_corso.pop(future)
+                log(f"⏱️ Timeout {fonte} dopo {timeout.get(fonte, 120)} s")
+                annullate[fonte].set()
+                driver = driver_attivi.get(fonte)
+                if driver:
+                    pool_driver.scarta(driver)
+                risultati[fonte] = (df_vuoto(), "")
+                _registra_esito(fonte, risultati[fonte][0], "timeout")
+                if on_risultato:
+                    on_risultato(fonte, *risultati[fonte])
+    finally:
+        svuota_messaggi()
+        executor.shutdown(wait=False, cancel_futures=True)
+    return risultati
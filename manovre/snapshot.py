@@ -0,0 +1,116 @@
+import threading
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from manovre import store, tempi
+from manovre.comune import get_ora_trieste, df_vuoto
+from manovre.interruttori import FONTE_TMT, FONTE_TASCO
+from manovre.turni import indicizza_turni, griglia_turni
+
+# --- SNAPSHOT CONDIVISO (uno per processo, comune a tutte le sessioni) ---
+# Il DataFrame pubblicato non viene mai modificato in-place: ogni aggiornamento
+# ne sostituisce il riferimento, le viste lavorano su copie filtrate.
+#
+# Per ogni fonte si tengono gli ultimi dati buoni con l'ora in cui sono stati
+# scaricati: una fonte che fallisce (o è sospesa dal suo interruttore) non
+# cancella quello che si sta mostrando. Anche l'indice per turno è separato
+# per fonte (turni = {fonte: indice}), così l'arrivo di una fonte ricalcola
+# solo la sua parte; lo stesso per la griglia di pianificazione (griglie).
+class SnapshotCondiviso:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.dati_totali = df_vuoto()
+        self.turni = {}
+        self.griglie = {}
+        self.fonti = {}
+        self.ultimo_aggiornamento = None
+        self.debug_msg_tasco = ""
+        self.versione_store = None
+        self.versione = 0
+        self.revalida_in_corso = False
+
+    def scaduto(self, ttl_min):
+        if self.ultimo_aggiornamento is None:
+            return True
+        return get_ora_trieste() - self.ultimo_aggiornamento >= timedelta(minutes=ttl_min)
+
+    # Tabella unica ricostruita dalle fonti (solo una concatenazione); indici e
+    # griglie arrivano già calcolati per fonte
+    def _componi(self, fonti, turni, griglie):
+        frames = [fonti[f][0] for f in (FONTE_TMT, FONTE_TASCO) if f in fonti]
+        self.dati_totali = pd.concat(frames, ignore_index=True) if frames else df_vuoto()
+        self.turni = turni
+        self.griglie = griglie
+        self.fonti = fonti
+
+    # Dati letti dall'archivio, divisi per fonte come quelli scaricati: un
+    # aggiornamento dal pulsante sostituisce solo le fonti che arrivano e le
+    # altre restano quelle dell'archivio.
+    def _imposta_archivio(self, fonti):
+        self._componi(
+            fonti,
+            {f: indicizza_turni(df) for f, (df, _, _) in fonti.items()},
+            {f: griglia_turni(df) for f, (df, _, _) in fonti.items()},
+        )
+
+    # Pubblica una fonte appena scaricata (chiamata man mano che le fonti
+    # terminano). Una fonte senza navi lascia tutto com'è.
+    def pubblica_fonte(self, fonte, df, nota):
+        if df.empty:
+            return
+        fonti = {**self.fonti, fonte: (df, nota, get_ora_trieste())}
+        turni = {f: self.turni[f] for f in fonti if f in self.turni}
+        turni[fonte] = indicizza_turni(df)
+        griglie = {f: self.griglie[f] for f in fonti if f in self.griglie}
+        griglie[fonte] = griglia_turni(df)
+        self._componi(fonti, turni, griglie)
+        if fonte == FONTE_TASCO:
+            self.debug_msg_tasco = nota
+        self.versione += 1
+
+    def concludi_aggiornamento(self):
+        self.ultimo_aggiornamento = get_ora_trieste()
+        self.versione += 1
+
+    # versione = (ultimo scraping, ultima modifica dei dati): se lo scraping
+    # non ha cambiato nulla si aggiorna solo l'orario, senza rileggere i movimenti.
+    def ricarica_da_store(self, path):
+        versione = store.versione(path)
+        if versione is None or versione == self.versione_store:
+            return
+        with self.lock:
+            if self.versione_store is None or versione[1] != self.versione_store[1]:
+                fonti = store.carica_fonti(path)
+                self._imposta_archivio(fonti)
+                self.debug_msg_tasco = fonti[FONTE_TASCO][1] if FONTE_TASCO in fonti else ""
+            self.ultimo_aggiornamento = datetime.fromisoformat(versione[0])
+            self.versione_store = versione
+
+# --- AGGIORNAMENTO ---
+# Ogni fonte viene pubblicata appena termina (on_risultato di scarica_fonti,
+# chiamato dal thread che aggiorna); `on_fonte` permette all'interfaccia di
+# ridisegnare subito tabella e indicatori. Con `store_path` i risultati vengono
+# anche salvati nell'archivio.
+def esegui_aggiornamento(snapshot, credenziali, log, on_fonte=None, parallelo=True, tmt_http=True, store_path=""):
+    # Importato qui: selenium e i browser servono solo quando si scarica davvero
+    from manovre.scraping import scarica_fonti
+
+    def fonte_pronta(fonte, df, nota):
+        with tempi.fase("pubblicazione", fonte=fonte) as fase:
+            snapshot.pubblica_fonte(fonte, df, nota)
+            fase["righe"] = len(df)
+        if on_fonte:
+            on_fonte(fonte, df)
+
+    # Anche se qualcosa va storto l'aggiornamento si chiude: altrimenti lo
+    # snapshot resterebbe scaduto e ogni rerun ne farebbe partire un altro.
+    try:
+        risultati = scarica_fonti(credenziali, parallelo=parallelo, tmt_http=tmt_http, log=log, on_risultato=fonte_pronta)
+
+        if store_path:
+            with tempi.fase("archivio"):
+                for fonte, (df, nota) in risultati.items():
+                    if not df.empty: store.salva_fonte(store_path, fonte, df, nota)
+    finally:
+        snapshot.concludi_aggiornamento()
@@ -0,0 +1,297 @@
+import os
+import sqlite3
+from contextlib import closing
+from datetime import datetime
+
+import pandas as pd
+
+from manovre.comune import COLONNE, get_ora_trieste, df_vuoto
+
+# --- ARCHIVIO LOCALE (SQLite) ---
+# Lo scheduler scrive qui l'ultimo risultato di ogni fonte, l'interfaccia lo legge.
+# Ogni fonte viene sostituita in un'unica transazione: chi legge vede sempre
+# o la versione precedente o quella nuova, mai uno stato intermedio.
+#
+# Oltre allo stato attuale (movimenti) si conserva lo storico: ogni scraping
+# viene confrontato con il precedente sulla chiave (Terminal, Vessel) e in
+# `variazioni` si registrano solo i movimenti inseriti, modificati o rimossi.
+DB_PATH_DEFAULT = "manovre.sqlite"
+
+INSERITO = "inserito"
+MODIFICATO = "modificato"
+RIMOSSO = "rimosso"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS movimenti (
+    fonte TEXT NOT NULL,
+    terminal TEXT,
+    vessel TEXT,
+    eta TEXT,
+    etd TEXT,
+    occorrenza INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_movimenti_fonte ON movimenti (fonte);
+CREATE TABLE IF NOT EXISTS fonti (
+    fonte TEXT PRIMARY KEY,
+    aggiornato_il TEXT NOT NULL,
+    righe INTEGER NOT NULL,
+    nota TEXT,
+    modificato_il TEXT
+);
+CREATE TABLE IF NOT EXISTS scrape (
+    id INTEGER PRIMARY KEY,
+    fonte TEXT NOT NULL,
+    eseguito_il TEXT NOT NULL,
+    righe INTEGER NOT NULL,
+    inseriti INTEGER NOT NULL,
+    modificati INTEGER NOT NULL,
+    rimossi INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_scrape_tempo ON scrape (eseguito_il);
+CREATE TABLE IF NOT EXISTS variazioni (
+    id INTEGER PRIMARY KEY,
+    scrape_id INTEGER NOT NULL REFERENCES scrape (id),
+    rilevato_il TEXT NOT NULL,
+    fonte TEXT NOT NULL,
+    terminal TEXT,
+    vessel TEXT,
+    occorrenza INTEGER NOT NULL,
+    tipo TEXT NOT NULL,
+    eta_prima TEXT,
+    etd_prima TEXT,
+    eta TEXT,
+    etd TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_variazioni_tempo ON variazioni (rilevato_il);
+CREATE INDEX IF NOT EXISTS idx_variazioni_nave ON variazioni (fonte, terminal, vessel, occorrenza, id);
+CREATE INDEX IF NOT EXISTS idx_variazioni_eta ON variazioni (eta);
+CREATE INDEX IF NOT EXISTS idx_variazioni_etd ON variazioni (etd);
+CREATE TABLE IF NOT EXISTS interruttori (
+    fonte TEXT PRIMARY KEY,
+    stato TEXT NOT NULL,
+    errori INTEGER NOT NULL,
+    riapertura_il TEXT,
+    ultimo_errore TEXT,
+    aggiornato_il TEXT NOT NULL
+);
+"""
+
+# Colonne aggiunte dopo la prima versione dell'archivio
+MIGRAZIONI = [
+    ("movimenti", "occorrenza", "INTEGER NOT NULL DEFAULT 0"),
+    ("fonti", "modificato_il", "TEXT"),
+]
+
+CHIAVE = ["terminal", "vessel", "occorrenza"]
+
+def get_db_path():
+    return os.environ.get("MANOVRE_DB", DB_PATH_DEFAULT)
+
+def _migra(conn):
+    for tabella, colonna, definizione in MIGRAZIONI:
+        esistenti = {r[1] for r in conn.execute(f"PRAGMA table_info({tabella})")}
+        if esistenti and colonna not in esistenti:
+            conn.execute(f"ALTER TABLE {tabella} ADD COLUMN {colonna} {definizione}")
+
+def apri(path):
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    _migra(conn)
+    conn.executescript(SCHEMA)
+    return conn
+
+def _iso(val):
+    return val.isoformat() if pd.notnull(val) else None
+
+# Righe pronte per SQLite: date in ISO 8601 (confrontabili come testo) e
+# `occorrenza` per distinguere la stessa nave ripetuta sullo stesso terminal.
+def _righe_archivio(df):
+    righe = pd.DataFrame({
+        "terminal": df["Terminal"].to_numpy(),
+        "vessel": df["Vessel"].to_numpy(),
+        "eta": [_iso(v) for v in df["ETA"]],
+        "etd": [_iso(v) for v in df["ETD"]],
+    })
+    righe["occorrenza"] = righe.groupby(["terminal", "vessel"], dropna=False).cumcount()
+    return righe
+
+def _sql(riga):
+    return tuple(None if pd.isna(v) else v for v in riga)
+
+def _diversi(a, b):
+    return ~((a == b) | (a.isna() & b.isna()))
+
+def calcola_variazioni(attuali, nuovi):
+    unione = attuali.merge(nuovi, on=CHIAVE, how="outer", suffixes=("_prima", ""), indicator=True)
+
+    inseriti = unione["_merge"] == "right_only"
+    rimossi = unione["_merge"] == "left_only"
+    entrambi = unione["_merge"] == "both"
+    cambiati = entrambi & (_diversi(unione["eta"], unione["eta_prima"]) | _diversi(unione["etd"], unione["etd_prima"]))
+
+    unione["tipo"] = None
+    unione.loc[inseriti, "tipo"] = INSERITO
+    unione.loc[cambiati, "tipo"] = MODIFICATO
+    unione.loc[rimossi, "tipo"] = RIMOSSO
+    return unione[unione["tipo"].notna()][CHIAVE + ["tipo", "eta_prima", "etd_prima", "eta", "etd"]]
+
+def salva_fonte(path, fonte, df, nota=""):
+    nuovi = _righe_archivio(df[COLONNE])
+    ora = get_ora_trieste().isoformat()
+
+    with closing(apri(path)) as conn, conn:
+        attuali = pd.read_sql_query(
+            "SELECT terminal, vessel, occorrenza, eta, etd FROM movimenti WHERE fonte = ?",
+            conn, params=(fonte,),
+        )
+        variazioni = calcola_variazioni(attuali, nuovi)
+        conteggi = variazioni["tipo"].value_counts()
+
+        scrape_id = conn.execute(
+            "INSERT INTO scrape (fonte, eseguito_il, righe, inseriti, modificati, rimossi) VALUES (?, ?, ?, ?, ?, ?)",
+            (fonte, ora, len(nuovi), int(conteggi.get(INSERITO, 0)),
+             int(conteggi.get(MODIFICATO, 0)), int(conteggi.get(RIMOSSO, 0))),
+        ).lastrowid
+
+        modificato_il = conn.execute("SELECT modificato_il FROM fonti WHERE fonte = ?", (fonte,)).fetchone()
+        modificato_il = modificato_il[0] if modificato_il else None
+
+        # Se nulla è cambiato lo stato attuale resta com'è: si aggiorna solo l'orario
+        if not variazioni.empty or modificato_il is None:
+            conn.executemany(
+                "INSERT INTO variazioni (scrape_id, rilevato_il, fonte, terminal, vessel, occorrenza, tipo, eta_prima, etd_prima, eta, etd) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(scrape_id, ora, fonte, *_sql(r)) for r in variazioni.itertuples(index=False)],
+            )
+            conn.execute("DELETE FROM movimenti WHERE fonte = ?", (fonte,))
+            conn.executemany(
+                "INSERT INTO movimenti (fonte, terminal, vessel, eta, etd, occorrenza) VALUES (?, ?, ?, ?, ?, ?)",
+                [(fonte, *_sql((r.terminal, r.vessel, r.eta, r.etd)), int(r.occorrenza)) for r in nuovi.itertuples(index=False)],
+            )
+            modificato_il = ora
+
+        conn.execute(
+            "INSERT OR REPLACE INTO fonti (fonte, aggiornato_il, righe, nota, modificato_il) VALUES (?, ?, ?, ?, ?)",
+            (fonte, ora, len(nuovi), nota, modificato_il),
+        )
+    return variazioni
+
+# Identifica la versione corrente dell'archivio: (ultimo scraping, ultima
+# modifica dei dati). Basta una query sulla tabella fonti per capire se vale
+# la pena ricaricare i movimenti.
+def versione(path):
+    if not os.path.exists(path):
+        return None
+    with closing(apri(path)) as conn:
+        row = conn.execute("SELECT MAX(aggiornato_il), MAX(modificato_il) FROM fonti").fetchone()
+    return row if row and row[0] else None
+
+def _a_dataframe(df):
+    df = df.rename(columns={"terminal": "Terminal", "vessel": "Vessel", "eta": "ETA", "etd": "ETD"})
+    for col in ("ETA", "ETD", "eta_prima", "etd_prima", "rilevato_il"):
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col], errors='coerce')
+    return df
+
+def carica_snapshot(path):
+    if not os.path.exists(path):
+        return df_vuoto(), None, {}
+
+    with closing(apri(path)) as conn:
+        df = pd.read_sql_query(
+            "SELECT terminal, vessel, eta, etd FROM movimenti ORDER BY fonte, rowid",
+            conn,
+        )
+        fonti = conn.execute("SELECT fonte, aggiornato_il, nota FROM fonti").fetchall()
+
+    ultimo = max((pd.Timestamp(f[1]).to_pydatetime() for f in fonti), default=None)
+    note = {f[0]: f[2] or "" for f in fonti}
+    return _a_dataframe(df), ultimo, note
+
+# Come carica_snapshot ma diviso per fonte: {fonte: (DataFrame, nota, aggiornato_il)}
+def carica_fonti(path):
+    if not os.path.exists(path):
+        return {}
+
+    with closing(apri(path)) as conn:
+        df = pd.read_sql_query(
+            "SELECT fonte, terminal, vessel, eta, etd FROM movimenti ORDER BY fonte, rowid",
+            conn,
+        )
+        fonti = conn.execute("SELECT fonte, aggiornato_il, nota FROM fonti").fetchall()
+
+    df = _a_dataframe(df)
+    per_fonte = {fonte: parte.drop(columns="fonte").reset_index(drop=True) for fonte, parte in df.groupby("fonte", sort=False)}
+    return {
+        fonte: (per_fonte[fonte], nota or "", pd.Timestamp(aggiornato_il).to_pydatetime())
+        for fonte, aggiornato_il, nota in fonti if fonte in per_fonte
+    }
+
+# --- STATO DELLE FONTI ---
+# Lo scheduler salva lo stato dei suoi interruttori (vedi manovre.interruttori)
+# perché l'interfaccia possa mostrarlo insieme all'età dei dati di ogni fonte.
+def salva_interruttori(path, stati):
+    ora = get_ora_trieste().isoformat()
+    with closing(apri(path)) as conn, conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO interruttori (fonte, stato, errori, riapertura_il, ultimo_errore, aggiornato_il) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            [(s["fonte"], s["stato"], s["errori"], _iso(s["riapertura_il"]), s["ultimo_errore"], ora) for s in stati],
+        )
+
+# {fonte: {aggiornato_il, stato, errori, riapertura_il, ultimo_errore}}
+# aggiornato_il è l'ultimo scraping andato a buon fine (età dei dati mostrati).
+def stato_fonti(path):
+    if not os.path.exists(path):
+        return {}
+    with closing(apri(path)) as conn:
+        fonti = conn.execute("SELECT fonte, aggiornato_il FROM fonti").fetchall()
+        interruttori = conn.execute("SELECT fonte, stato, errori, riapertura_il, ultimo_errore FROM interruttori").fetchall()
+
+    stato = {f: {"aggiornato_il": datetime.fromisoformat(agg)} for f, agg in fonti}
+    for fonte, stato_int, errori, riapertura, errore in interruttori:
+        stato.setdefault(fonte, {"aggiornato_il": None}).update({
+            "stato": stato_int,
+            "errori": errori,
+            "riapertura_il": datetime.fromisoformat(riapertura) if riapertura else None,
+            "ultimo_errore": errore or "",
+        })
+    return stato
+
+# --- INTERROGAZIONI SULLO STORICO ---
+# Ultima versione nota di ogni movimento con arrivo o partenza nel periodo,
+# anche se nel frattempo è sparito dai siti (le rimozioni non cancellano lo
+# stato precedente). Usa gli indici su eta/etd e sulla chiave della nave.
+def movimenti_nel_periodo(path, start, end):
+    query = """
+        SELECT v.fonte, v.terminal, v.vessel, v.eta, v.etd, v.rilevato_il
+        FROM variazioni v
+        WHERE v.tipo != :rimosso
+          AND (v.eta BETWEEN :start AND :end OR v.etd BETWEEN :start AND :end)
+          AND NOT EXISTS (
+              SELECT 1 FROM variazioni w
+              WHERE w.fonte = v.fonte AND w.terminal IS v.terminal AND w.vessel IS v.vessel
+                AND w.occorrenza = v.occorrenza AND w.id > v.id AND w.tipo != :rimosso
+          )
+        ORDER BY COALESCE(v.eta, v.etd)
+    """
+    with closing(apri(path)) as conn:
+        df = pd.read_sql_query(query, conn, params={
+            "rimosso": RIMOSSO, "start": start.isoformat(), "end": end.isoformat(),
+        })
+    return _a_dataframe(df)
+
+# Variazioni rilevate da `dal` in poi; con solo_eta=True solo i cambi di ETA.
+def variazioni_dal(path, dal, solo_eta=False):
+    query = """
+        SELECT rilevato_il, fonte, terminal, vessel, tipo, eta_prima, eta, etd_prima, etd
+        FROM variazioni
+        WHERE rilevato_il >= ?
+    """
+    if solo_eta:
+        query += f" AND tipo = '{MODIFICATO}' AND eta IS NOT eta_prima"
+    query += " ORDER BY rilevato_il DESC, id DESC"
+
+    with closing(apri(path)) as conn:
+        df = pd.read_sql_query(query, conn, params=(dal.isoformat(),))
+    return _a_dataframe(df)
@@ -0,0 +1,184 @@
+import json
+import logging
+import os
+import threading
+import time as time_module
+import uuid
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+
+import pandas as pd
+
+from manovre.comune import get_ora_trieste
+
+# --- TEMPI DI AGGIORNAMENTO ---
+# Ogni passaggio di un aggiornamento (avvio browser, pagina TMT, login TASCO,
+# menu, export, lettura Excel...) viene misurato con `fase` e scritto come riga
+# JSON in un log a rotazione. Tutte le fasi di uno stesso aggiornamento
+# condividono l'id impostato da `aggiornamento`, anche quelle nei thread delle
+# fonti: per processo gira un solo aggiornamento alla volta.
+LOG_PATH_DEFAULT = "manovre_tempi.jsonl"
+LOG_MAX_BYTES = 2_000_000
+LOG_BACKUP = 3
+
+def get_log_path():
+    return os.environ.get("MANOVRE_LOG_TEMPI", LOG_PATH_DEFAULT)
+
+class RegistroTempi:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.path = None
+        self.logger = None
+        self.aggiornamento_id = None
+
+    def configura(self, path):
+        with self.lock:
+            if self.logger is not None and path == self.path:
+                return
+            logger = logging.getLogger(f"manovre.tempi.{path}")
+            logger.propagate = False
+            logger.setLevel(logging.INFO)
+            if path and not logger.handlers:
+                handler = RotatingFileHandler(path, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP, encoding="utf-8")
+                handler.setFormatter(logging.Formatter("%(message)s"))
+                logger.addHandler(handler)
+            self.path = path
+            self.logger = logger
+
+    def scrivi(self, record):
+        if self.logger is None:
+            self.configura(get_log_path())
+        if not self.path:
+            return
+        try:
+            self.logger.info(json.dumps(record, ensure_ascii=False, default=str))
+        except Exception as e:
+            print(f"Errore log tempi: {e}")
+
+_registro = RegistroTempi()
+
+def configura(path):
+    _registro.configura(path)
+
+# Segna l'inizio di un aggiornamento: le fasi misurate finché è aperto ne
+# riportano l'id. Registra anche la durata complessiva come fase "aggiornamento".
+@contextmanager
+def aggiornamento(origine):
+    precedente = _registro.aggiornamento_id
+    _registro.aggiornamento_id = uuid.uuid4().hex[:12]
+    try:
+        with fase("aggiornamento", origine=origine) as dati:
+            yield dati
+    finally:
+        _registro.aggiornamento_id = precedente
+
+# Misura il blocco e scrive {aggiornamento, fase, inizio, durata_s, ok, ...}.
+# Il dizionario restituito accetta attributi extra (es. righe, nota) e
+# `ok=False` per le fasi che falliscono senza sollevare eccezioni.
+@contextmanager
+def fase(nome, **attributi):
+    dati = dict(attributi)
+    inizio = get_ora_trieste()
+    t0 = time_module.perf_counter()
+    try:
+        yield dati
+    except Exception as e:
+        dati["ok"] = False
+        dati.setdefault("errore", str(e))
+        raise
+    finally:
+        record = {
+            "aggiornamento": _registro.aggiornamento_id,
+            "fase": nome,
+            "inizio": inizio.isoformat(),
+            "durata_s": round(time_module.perf_counter() - t0, 4),
+            "ok": True,
+        }
+        record.update(dati)
+        _registro.scrivi(record)
+
+# --- LETTURA E STATISTICHE ---
+def _file_log(path):
+    # Dal più vecchio (path.3) al più recente (path)
+    candidati = [f"{path}.{i}" for i in range(LOG_BACKUP, 0, -1)] + [path]
+    return [p for p in candidati if os.path.exists(p)]
+
+def versione_log(path):
+    return tuple((p, os.path.getmtime(p), os.path.getsize(p)) for p in _file_log(path))
+
+def leggi(path):
+    righe = []
+    for p in _file_log(path):
+        with open(p, encoding="utf-8") as f:
+            for riga in f:
+                try:
+                    righe.append(json.loads(riga))
+                except ValueError:
+                    continue
+    if not righe:
+        return pd.DataFrame(columns=["aggiornamento", "fase", "inizio", "durata_s", "ok"])
+    return pd.DataFrame(righe)
+
+# Percentili per fase sugli ultimi `ultimi` aggiornamenti completati (le fasi
+# fuori da un aggiornamento, es. browser avviati in anticipo, sono escluse).
+def statistiche(df, ultimi=20):
+    colonne = ["Fase", "Campioni", "p50 (s)", "p95 (s)", "Ultimo (s)", "Errori"]
+    df = df[df["aggiornamento"].notna()]
+    chiusi = df.loc[df["fase"] == "aggiornamento", "aggiornamento"]
+    if chiusi.empty:
+        return pd.DataFrame(columns=colonne)
+    df = df[df["aggiornamento"].isin(chiusi.iloc[-ultimi:])]
+
+    durate = df["durata_s"].astype(float).groupby(df["fase"], sort=False)
+    risultato = pd.DataFrame({
+        "Fase": durate.size().index,
+        "Campioni": durate.size().to_numpy(),
+        "p50 (s)": durate.quantile(0.5).to_numpy(),
+        "p95 (s)": durate.quantile(0.95).to_numpy(),
+        "Ultimo (s)": durate.last().to_numpy(),
+        "Errori": df["ok"].eq(False).groupby(df["fase"], sort=False).sum().to_numpy(),
+    })
+    return risultato.sort_values("p50 (s)", ascending=False, ignore_index=True)
+
+# --- TIMEOUT ADATTIVI ---
+# Durate recenti delle attese del browser (solo in memoria, per passaggio). Il
+# timeout è un multiplo del p95 osservato, tra `minimo` e il massimo indicato
+# da chi attende: se i siti rispondono in fretta un errore si scopre prima.
+# Le attese su condizione finiscono comunque appena la pagina è pronta, quindi
+# il minimo è largo. Dopo un'attesa scaduta si torna subito al massimo finché
+# il passaggio non riesce di nuovo: un giorno lento non deve aspettare che il
+# p95 di 20 campioni se ne accorga, intanto le fonti fallirebbero.
+class LatenzeRecenti:
+    def __init__(self, campioni=20, fattore=3.0, minimo=10.0, campioni_min=3):
+        self.lock = threading.Lock()
+        self.campioni = campioni
+        self.fattore = fattore
+        self.minimo = minimo
+        self.campioni_min = campioni_min
+        self.valori = {}
+        self.scaduti = set()
+
+    def osserva(self, passaggio, secondi):
+        with self.lock:
+            valori = self.valori.setdefault(passaggio, [])
+            valori.append(secondi)
+            del valori[:-self.campioni]
+            self.scaduti.discard(passaggio)
+
+    # Attesa finita per timeout: conta come latenza pari al timeout e fino al
+    # prossimo successo il passaggio usa il timeout massimo
+    def scaduto(self, passaggio, secondi):
+        self.osserva(passaggio, secondi)
+        with self.lock:
+            self.scaduti.add(passaggio)
+
+    def timeout(self, passaggio, massimo):
+        with self.lock:
+            valori = list(self.valori.get(passaggio, ()))
+            scaduto = passaggio in self.scaduti
+        if scaduto or len(valori) < self.campioni_min:
+            return massimo
+        p95 = pd.Series(valori).quantile(0.95)
+        return float(min(massimo, max(self.minimo, self.fattore * p95)))
+
+latenze = LatenzeRecenti()
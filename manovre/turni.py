@@ -0,0 +1,227 @@
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+# --- NUOVA LOGICA TURNI ---
+def calcola_turno_attuale(ora_riferimento):
+    t_mattina_start = ora_riferimento.replace(hour=8, minute=0, second=0, microsecond=0)
+    t_sera_start = ora_riferimento.replace(hour=20, minute=0, second=0, microsecond=0)
+
+    if 8 <= ora_riferimento.hour < 20:
+        start = t_mattina_start
+        end = t_sera_start
+        label = f"Diurno (08-20) del {start.strftime('%d/%m/%Y')}"
+    else:
+        if ora_riferimento.hour >= 20:
+            start = t_sera_start
+            end = t_sera_start + timedelta(hours=12)
+        else:
+            start = t_sera_start - timedelta(days=1)
+            end = t_mattina_start
+
+        label = f"Notturno (20-08) del {start.strftime('%d/%m/%Y')}"
+
+    return start, end, label
+
+def genera_opzioni_future(ora_riferimento):
+    opzioni = {}
+    _, fine_turno_attuale, _ = calcola_turno_attuale(ora_riferimento)
+    cursore = fine_turno_attuale
+
+    for _ in range(6):
+        start = cursore
+        end = cursore + timedelta(hours=12)
+        if start.hour == 8:
+            tipo = "Diurno (08-20)"
+            data_str = start.strftime('%d/%m/%Y')
+        else:
+            tipo = "Notturno (20-08)"
+            data_str = start.strftime('%d/%m/%Y')
+
+        label = f"{tipo} del {data_str}"
+        opzioni[label] = (start, end)
+        cursore = end
+    return opzioni
+
+
+# --- CLASSIFICAZIONE MANOVRE DEL TURNO ---
+# Tutto con maschere booleane sull'intera tabella, senza passare riga per riga.
+# Restituisce le sole manovre del turno, ordinate, con le colonne aggiuntive
+# Tipo (ARRIVO / PARTENZA / ARRIVO + PARTENZA), SortKey (primo orario rilevante
+# nel turno) e, se è indicata `ora`, Passato (SortKey già trascorso).
+def classifica_turno(df, start, end, ora=None):
+    arrivo = df['ETA'].between(start, end)
+    partenza = df['ETD'].between(start, end)
+    nel_turno = arrivo | partenza
+
+    df_turno = df[nel_turno].copy()
+    arrivo = arrivo[nel_turno]
+    partenza = partenza[nel_turno]
+
+    df_turno['Tipo'] = np.where(
+        arrivo & partenza, "ARRIVO + PARTENZA",
+        np.where(arrivo, "ARRIVO", np.where(partenza, "PARTENZA", "-"))
+    )
+    df_turno['SortKey'] = pd.concat(
+        [df_turno['ETA'].where(arrivo), df_turno['ETD'].where(partenza)], axis=1
+    ).min(axis=1)
+    if ora is not None:
+        df_turno['Passato'] = df_turno['SortKey'] < ora
+
+    return df_turno.sort_values(by='SortKey')
+
+# --- INDICE PER TURNO ---
+# La griglia dei turni è fissa (08-20 / 20-08): all'arrivo di un nuovo snapshot
+# ogni movimento viene assegnato una volta sola ai turni in cui cade il suo ETA
+# o ETD, e per ogni turno si prepara la vista già classificata e ordinata.
+# Cambiare turno nell'interfaccia diventa una ricerca nel dizionario.
+INIZIO_GRIGLIA = timedelta(hours=8)
+DURATA_TURNO = timedelta(hours=12)
+
+def inizio_turno(orari):
+    return (orari - INIZIO_GRIGLIA).dt.floor(DURATA_TURNO) + INIZIO_GRIGLIA
+
+def indicizza_turni(df):
+    appartenenze = []
+    for col in ('ETA', 'ETD'):
+        orari = pd.to_datetime(df[col], errors='coerce').dropna()
+        inizi = inizio_turno(orari)
+        appartenenze.append(inizi)
+        # Gli estremi sono inclusi: un orario esattamente al cambio turno
+        # appartiene anche al turno che finisce in quel momento.
+        appartenenze.append(inizi[orari == inizi] - DURATA_TURNO)
+
+    coppie = pd.concat(appartenenze)
+    if coppie.empty:
+        return {}
+    coppie = pd.DataFrame({'riga': coppie.index, 'inizio': coppie.to_numpy()}).drop_duplicates()
+
+    indice = {}
+    for inizio, gruppo in coppie.groupby('inizio'):
+        start = pd.Timestamp(inizio).to_pydatetime()
+        righe = np.sort(gruppo['riga'].to_numpy())
+        indice[start] = classifica_turno(df.loc[righe], start, start + DURATA_TURNO)
+    return indice
+
+# Vista di un turno dall'indice, con il flag Passato calcolato su `ora`.
+# `indice` può essere anche una lista di indici, uno per fonte: all'arrivo di
+# una fonte si ricalcola solo il suo e qui si uniscono le parti del turno scelto.
+def vista_turno(indice, start, ora):
+    indici = indice if isinstance(indice, (list, tuple)) else [indice]
+    parti = [i[start] for i in indici if start in i]
+    if not parti:
+        return pd.DataFrame()
+    if len(parti) == 1:
+        df_turno = parti[0]
+    else:
+        df_turno = pd.concat(parti, ignore_index=True).sort_values(by='SortKey', kind='stable')
+    return df_turno.assign(Passato=df_turno['SortKey'] < ora)
+
+# --- GRIGLIA DI PIANIFICAZIONE ---
+# Arrivi e partenze di più giorni per turno e per terminal, per organizzare
+# le squadre. Ogni ETA/ETD diventa un evento assegnato al suo turno con la
+# stessa griglia (e la stessa regola sugli estremi) di indicizza_turni, in
+# un'unica operazione vettoriale; poi si conta e si elencano le navi.
+ARRIVO = "ARRIVO"
+PARTENZA = "PARTENZA"
+
+def griglia_turni(df):
+    colonne = ['Inizio', 'Terminal', 'Arrivi', 'Partenze', 'Totale', 'Navi']
+    if df.empty:
+        return pd.DataFrame(columns=colonne)
+
+    # "SIOT (3)" -> "SIOT": la griglia è per terminal, il pontile resta nell'elenco navi.
+    # I terminal distinti sono pochi: si elaborano una volta sola e si riespandono.
+    codici, distinti = pd.factorize(df['Terminal'].astype(str))
+    distinti = pd.Series(distinti)
+    terminal = distinti.str.split(' (', n=1, regex=False).str[0].to_numpy()[codici]
+    pontile = (' (' + distinti.str.extract(r'\((.*)\)$', expand=False) + ')').fillna('').to_numpy()[codici]
+    nave = df['Vessel'].astype(str) + pontile
+
+    eventi = pd.concat([
+        pd.DataFrame({'Terminal': terminal, 'Nave': nave, 'Tipo': tipo, 'Orario': pd.to_datetime(df[col], errors='coerce')})
+        for col, tipo in (('ETA', ARRIVO), ('ETD', PARTENZA))
+    ], ignore_index=True).dropna(subset=['Orario'])
+    if eventi.empty:
+        return pd.DataFrame(columns=colonne)
+
+    eventi['Inizio'] = inizio_turno(eventi['Orario'])
+    al_cambio = eventi[eventi['Orario'] == eventi['Inizio']]
+    eventi = pd.concat([eventi, al_cambio.assign(Inizio=al_cambio['Inizio'] - DURATA_TURNO)], ignore_index=True)
+    eventi = eventi.sort_values('Orario', kind='stable')
+
+    # strftime è lento: si formatta ogni orario distinto una volta sola
+    codici, orari = pd.factorize(eventi['Orario'])
+    eventi['Etichetta'] = (
+        np.where(eventi['Tipo'] == ARRIVO, '↓ ', '↑ ')
+        + orari.strftime('%d/%m %H:%M').to_numpy()[codici] + ' ' + eventi['Nave']
+    )
+
+    chiave = ['Inizio', 'Terminal']
+    conteggi = eventi.groupby(chiave + ['Tipo']).size().unstack('Tipo', fill_value=0)
+    griglia = pd.DataFrame({
+        'Arrivi': conteggi.get(ARRIVO, 0),
+        'Partenze': conteggi.get(PARTENZA, 0),
+    }, index=conteggi.index)
+    griglia['Totale'] = griglia['Arrivi'] + griglia['Partenze']
+    griglia['Navi'] = eventi.groupby(chiave)['Etichetta'].agg(', '.join)
+    return griglia.reset_index()[colonne]
+
+# Turni da `inizio` per `giorni` giorni, compresi quelli senza movimenti.
+# Come in vista_turno `griglia` può essere una lista, una griglia per fonte:
+# si uniscono solo le righe della finestra.
+def finestra_griglia(griglia, inizio, giorni):
+    fine = inizio + timedelta(days=giorni)
+    inizi = pd.date_range(inizio, fine - DURATA_TURNO, freq=DURATA_TURNO)
+    griglie = griglia if isinstance(griglia, (list, tuple)) else [griglia]
+    parti = [g[(g['Inizio'] >= inizio) & (g['Inizio'] < fine)] for g in griglie]
+    griglia = pd.concat(parti, ignore_index=True) if parti else griglia_turni(pd.DataFrame())
+
+    # Stesso terminal in più fonti: si sommano i conteggi e si uniscono gli elenchi
+    chiave = ['Inizio', 'Terminal']
+    if griglia.duplicated(chiave).any():
+        griglia = griglia.groupby(chiave, as_index=False).agg(
+            Arrivi=('Arrivi', 'sum'), Partenze=('Partenze', 'sum'), Totale=('Totale', 'sum'), Navi=('Navi', ', '.join))
+    return inizi, griglia.sort_values(chiave, ignore_index=True)
+
+def etichetta_turno(inizio):
+    giorni = ['Lun', 'Mar', 'Mer', 'Gio', 'Ven', 'Sab', 'Dom']
+    tipo = "Diurno" if inizio.hour == 8 else "Notturno"
+    return f"{giorni[inizio.weekday()]} {inizio:%d/%m} {tipo}"
+
+# --- STILE E COLORI ---
+GRIGIO = '#a0a0a0'
+STILE_PASSATO = f'color: {GRIGIO};'
+
+def _stile_evidenza(passato, sfondo, sfondo_passato, colore):
+    sfondo = np.where(passato, sfondo_passato, sfondo)
+    colore = np.where(passato, GRIGIO, colore)
+    base = np.where(passato, STILE_PASSATO, '')
+    return (
+        pd.Series(base) + ' background-color: ' + sfondo + '; color: ' + colore
+        + '; font-weight: bold; border: 2px solid ' + colore
+    ).to_numpy()
+
+# Stile dell'intera tabella in un colpo solo (Styler.apply con axis=None):
+# righe già trascorse in grigio, colonna ARRIVI/PARTENZE evidenziata in base al Tipo.
+def style_manovre(df_view):
+    passato = df_view['Passato'].to_numpy(dtype=bool)
+    tipo = df_view['Tipo'].astype(str)
+
+    stili = pd.DataFrame(
+        np.repeat(np.where(passato, STILE_PASSATO, '')[:, None], len(df_view.columns), axis=1),
+        index=df_view.index, columns=df_view.columns,
+    )
+
+    arrivo = tipo.str.contains('ARRIVO').to_numpy()
+    if 'ARRIVI' in stili.columns:
+        evidenza = _stile_evidenza(passato, '#d4edda', '#f2f9f4', '#155724')
+        stili['ARRIVI'] = np.where(arrivo, evidenza, stili['ARRIVI'])
+
+    partenza = tipo.str.contains('PARTENZA').to_numpy()
+    if 'PARTENZE' in stili.columns:
+        evidenza = _stile_evidenza(passato, '#f8d7da', '#fdf2f4', '#721c24')
+        stili['PARTENZE'] = np.where(partenza, evidenza, stili['PARTENZE'])
+
+    return stili